@@ -0,0 +1,65 @@
+"""
+Compare the cost of serializing student rows the old way and through the fast JSON path.
+
+Old path: one Student model per row, then what FastAPI does with response_model=List[Student]: validate the list again,
+dump it, run jsonable_encoder over it and json.dumps the result.
+New path: rows_to_json, which encodes the rows straight to bytes.
+
+Usage:
+    python bench_serialization.py --rows 10000 --repeat 5
+"""
+import time
+import argparse
+from typing import List
+from pydantic import TypeAdapter
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from uni_backend import Student, STUDENT_COLUMNS
+from serialization import JSONBytesResponse, rows_to_json, orjson
+
+
+def make_rows(count):
+    return [(f"Name{i}", f"Surname{i}", "2001-05-17", "Female" if i % 2 else "Male", "Italy", "Computer Science")
+            for i in range(count)]
+
+
+def old_path(rows):
+    students = [Student(name=row[0], surname=row[1], age=row[2], sex=row[3], nationality=row[4],
+                        field_of_studying=row[5]) for row in rows]
+    adapter = TypeAdapter(List[Student])
+    validated = adapter.validate_python(students)
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return JSONResponse(content).body
+
+
+def new_path(rows):
+    return JSONBytesResponse(rows_to_json(rows, STUDENT_COLUMNS)).body
+
+
+def best_time(func, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark student list serialization.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    old = best_time(old_path, rows, args.repeat)
+    new = best_time(new_path, rows, args.repeat)
+    encoder = "orjson" if orjson is not None else "json"
+    print(f"{args.rows} rows, best of {args.repeat}")
+    print(f"pydantic models + response_model: {old * 1000:8.2f} ms")
+    print(f"rows_to_json ({encoder}):{' ' * (14 - len(encoder))}{new * 1000:8.2f} ms")
+    print(f"speed-up: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Fixtures shared by the tests of the university backend.
+
+The backend opens university.db and reads config.ini in its working directory, so every test runs in a temporary
+folder with a copy of config.ini and its own database, and never touches university.db.
+- app_folder: the temporary folder, the test creates the database or starts the backend itself
+- client: a TestClient of the backend started in the temporary folder
+"""
+
+# Import necessary libraries
+import shutil
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+import uni_backend
+
+HERE = Path(__file__).parent
+
+
+@pytest.fixture
+def app_folder(tmp_path, monkeypatch):
+    shutil.copy(HERE / "config.ini", tmp_path / "config.ini")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def client(app_folder):
+    with TestClient(uni_backend.app) as client:
+        yield client
+
+
+def new_student(name, nationality="Italy", field_of_studying="Physics"):
+    return {"name": name, "surname": "Student", "age": "2000-01-18", "sex": "Female", "nationality": nationality,
+            "field_of_studying": field_of_studying}
@@ -0,0 +1,122 @@
+"""
+ETags for the list endpoints of the university backend.
+
+Each table has a change version that the writers bump inside their own transaction, stored in the change_versions table
+so every worker process shares it. The ETag of a list request is built from that version and the query parameters, so an
+unchanged list is answered with 304 before its query runs. The ETags also carry a random epoch per process.
+"""
+
+# Import necessary libraries
+import uuid
+import sqlite3
+import hashlib
+import threading
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+# Change counter of every table, bumped by the writers of all worker processes inside their own transactions
+VERSIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS change_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+"""
+
+
+def etag_matches(request: Request, etag):
+    """Return True when the If-None-Match header of the request contains etag."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    # If-None-Match uses weak comparison, so the W/ prefix is ignored on both sides
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(etag):
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+class ChangeVersions:
+    """Change counter per table, shared by every worker process through the change_versions table.
+
+    A writer calls bump() inside its own transaction and committed() once that transaction is committed. refresh()
+    watches PRAGMA data_version on a dedicated connection, which changes whenever any other connection commits, and
+    then reads the counters back. Versions reached by commits of this process are told apart from those of other
+    processes, so refresh() only reports the tables another worker wrote to.
+    Without a database_file the versions are only kept in this process, for data that no other process writes.
+    """
+
+    def __init__(self, database_file=None):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions = {}
+        # Last counters read from the database, and versions committed by this process that refresh() has not seen yet
+        self._seen = {}
+        self._local = {}
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._watcher = None
+        if database_file is not None:
+            self._watcher = sqlite3.connect(database_file, check_same_thread=False)
+
+    @staticmethod
+    def create_table(conn):
+        conn.execute(VERSIONS_TABLE)
+
+    @staticmethod
+    def bump(conn, table):
+        """Advance the version of table in the transaction of conn and return the new version."""
+        conn.execute("""
+            INSERT INTO change_versions (name, version) VALUES (?, 1)
+            ON CONFLICT (name) DO UPDATE SET version = version + 1
+        """, (table,))
+        return conn.execute("SELECT version FROM change_versions WHERE name=?", (table,)).fetchone()[0]
+
+    def committed(self, table, version):
+        """Record a version returned by bump() once its transaction is committed."""
+        with self._lock:
+            if version > self._seen.get(table, 0):
+                self._local.setdefault(table, set()).add(version)
+            self._versions[table] = max(self._versions.get(table, 0), version)
+
+    def refresh(self):
+        """Pick up the commits of other processes and return the names of the tables they changed.
+
+        This reads from SQLite, async handlers call refresh_async() instead.
+        """
+        if self._watcher is None:
+            return set()
+        with self._lock:
+            data_version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return set()
+            first_read = self._data_version is None
+            self._data_version = data_version
+            changed = set()
+            for table, version in self._watcher.execute("SELECT name, version FROM change_versions"):
+                seen = self._seen.get(table, 0)
+                if version <= seen:
+                    continue
+                local = self._local.get(table, set())
+                # Any version in between that this process did not commit was written by another worker
+                if not first_read and sum(1 for v in local if seen < v <= version) < version - seen:
+                    changed.add(table)
+                self._seen[table] = version
+                self._local[table] = {v for v in local if v > version}
+                self._versions[table] = max(self._versions.get(table, 0), version)
+            return changed
+
+    async def refresh_async(self):
+        return await run_in_threadpool(self.refresh)
+
+    def version(self, table):
+        return self._versions.get(table, 0)
+
+    def etag(self, table, *parts):
+        """Weak ETag for a read of table with the given request parameters."""
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:12]
+        return f'W/"{self.epoch}-{table}-{self.version(table)}-{digest}"'
+
+    def close(self):
+        if self._watcher is not None:
+            self._watcher.close()
@@ -0,0 +1,83 @@
+"""
+Non-blocking JSON logging for the university backend.
+
+Handlers only put records on a queue, a QueueListener thread formats them as JSON lines and writes the log file.
+Records of the "access" logger can be sampled with access_sample_rate.
+"""
+
+# Import necessary libraries
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+
+# Logger used for the high-volume per-request lines
+ACCESS_LOGGER = "access"
+
+# Attributes every LogRecord has, anything else was passed through extra= and is added to the JSON line
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a single line JSON object."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep roughly `rate` of the records, warnings and errors are always kept."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def setup_logging(filename, level="INFO", access_sample_rate=1.0):
+    """Route the root logger through a queue and return the started QueueListener."""
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    access_logger = logging.getLogger(ACCESS_LOGGER)
+    for log_filter in list(access_logger.filters):
+        if isinstance(log_filter, SamplingFilter):
+            access_logger.removeFilter(log_filter)
+    if access_sample_rate < 1.0:
+        access_logger.addFilter(SamplingFilter(access_sample_rate))
+
+    listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(listener.stop)
+    return listener
+
+
+def stop_logging(listener):
+    """Stop a listener returned by setup_logging before the process exits, writing out the queued records."""
+    atexit.unregister(listener.stop)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
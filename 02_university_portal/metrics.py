@@ -0,0 +1,225 @@
+"""
+Request and SQLite metrics for the university backend in the Prometheus text format.
+
+MetricsMiddleware times every request per route template, InstrumentedConnection is a sqlite3 connection factory
+whose cursors time every statement. Both record into REGISTRY, which is served at GET /metrics.
+"""
+
+# Import necessary libraries
+import re
+import time
+import sqlite3
+import threading
+from collections import defaultdict
+
+# Histogram buckets in seconds for request and query durations
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Histogram buckets for the number of rows touched by a statement
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+STATEMENT_PATTERN = re.compile(r"^\s*(UPDATE)\s+(\w+)|^\s*(\w+).*?\b(?:FROM|INTO|TABLE(?: IF NOT EXISTS)?|ON)\s+(\w+)",
+                               re.IGNORECASE | re.DOTALL)
+
+
+def statement_label(sql):
+    """Reduce a SQL statement to a low-cardinality label such as "SELECT orders"."""
+    match = STATEMENT_PATTERN.match(sql)
+    if match:
+        verb, table = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+        return f"{verb.upper()} {table}"
+    return sql.split(None, 1)[0].upper() if sql.strip() else "EMPTY"
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][index] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.label_names + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(self.label_names + ('le',), labels + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = defaultdict(float)
+
+    def inc(self, labels, amount=1):
+        self._values[labels] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """Thread-safe store of every metric of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = Counter("http_requests_total", "Number of HTTP requests.", ("method", "route", "status"))
+        self.request_duration = Histogram("http_request_duration_seconds", "HTTP request duration in seconds.",
+                                          ("method", "route"), DURATION_BUCKETS)
+        self.query_duration = Histogram("sqlite_query_duration_seconds", "SQLite statement duration in seconds.",
+                                        ("statement",), DURATION_BUCKETS)
+        self.query_rows = Histogram("sqlite_query_rows", "Rows returned or changed by a SQLite statement.",
+                                    ("statement",), ROW_BUCKETS)
+        self.query_errors = Counter("sqlite_query_errors_total", "Number of failed SQLite statements.",
+                                    ("statement",))
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, method, route, status, duration):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests.inc((method, route, str(status)))
+            self.request_duration.observe((method, route), duration)
+
+    def observe_query(self, statement, duration, rows, failed=False):
+        with self._lock:
+            self.query_duration.observe((statement,), duration)
+            if failed:
+                self.query_errors.inc((statement,))
+            elif rows is not None:
+                self.query_rows.observe((statement,), rows)
+
+    def observe_rows(self, statement, rows):
+        with self._lock:
+            self.query_rows.observe((statement,), rows)
+
+    def render(self):
+        with self._lock:
+            lines = ["# HELP http_requests_in_flight Number of HTTP requests being served.",
+                     "# TYPE http_requests_in_flight gauge",
+                     f"http_requests_in_flight {self.in_flight}"]
+            for metric in (self.requests, self.request_duration, self.query_duration, self.query_rows,
+                           self.query_errors):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method and route template."""
+
+    def __init__(self, app, registry=REGISTRY):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.registry.request_started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope, unmatched paths share one label
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            self.registry.request_finished(scope["method"], route_path, status, time.perf_counter() - start)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports the duration and row count of every statement to REGISTRY."""
+
+    statement = None
+
+    def _timed(self, method, sql, *args):
+        statement = self.statement = statement_label(sql)
+        start = time.perf_counter()
+        try:
+            result = method(sql, *args)
+        except Exception:
+            REGISTRY.observe_query(statement, time.perf_counter() - start, None, failed=True)
+            raise
+        # Reads report -1 as rowcount, their rows are counted when they are fetched
+        rows = self.rowcount if self.rowcount >= 0 else None
+        REGISTRY.observe_query(statement, time.perf_counter() - start, rows)
+        return result
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        row = super().fetchone()
+        REGISTRY.observe_rows(self.statement, 0 if row is None else 1)
+        return row
+
+    def fetchall(self):
+        rows = super().fetchall()
+        REGISTRY.observe_rows(self.statement, len(rows))
+        return rows
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        REGISTRY.observe_rows(self.statement, len(rows))
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection factory whose cursors, including the ones of execute(), are InstrumentedCursor."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,77 @@
+"""
+Versioned schema migrations for the university database.
+
+The backend lists its migrations in order, each one a function changing the schema on a connection, and PRAGMA
+user_version counts the ones a database has. migrate() applies the missing ones in one transaction under the write
+lock, so several workers starting together migrate the database once and an up to date database is not locked at all.
+The given queries are then checked to find their rows through an index, before ANALYZE refreshes the planner
+statistics: on a table of a handful of rows the analyzed planner rightly prefers a scan.
+
+Usage:
+    migrate(conn, MIGRATIONS, CHECKED_QUERIES)
+"""
+
+# Import necessary libraries
+import logging
+
+# Query plan details of a lookup through an index, anything else starting with SCAN reads the whole table
+INDEX_LOOKUPS = ("USING INDEX", "USING COVERING INDEX", "USING PRIMARY KEY", "USING INTEGER PRIMARY KEY",
+                 "USING ROWID", "VIRTUAL TABLE INDEX")
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, migrations, checked_queries=()):
+    """Apply the migrations the database does not have yet and return how many were applied.
+
+    migrations[i] is a (description, function) pair whose function(conn) brings the schema from version i to i + 1,
+    checked_queries holds the (name, sql, params) queries that have to use an index.
+    """
+    latest = len(migrations)
+    if schema_version(conn) == latest:
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Read again under the write lock, another worker may have migrated the database in the meantime
+        version = schema_version(conn)
+        if version > latest:
+            raise RuntimeError(f"The database has schema version {version}, this code only knows {latest}")
+        for number in range(version, latest):
+            description, apply = migrations[number]
+            apply(conn)
+            logging.info(f"Applied schema migration {number + 1}: {description}.")
+        if version < latest:
+            conn.execute(f"PRAGMA user_version = {latest}")
+            for name, detail in full_scans(conn, checked_queries):
+                logging.warning(f"The '{name}' query reads the whole table: {detail}")
+            conn.execute("ANALYZE")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return latest - version
+
+
+def full_scans(conn, queries):
+    """Return (name, plan detail) for every step of the queries that reads a whole table instead of using an index.
+
+    queries holds (name, sql, params) tuples, the statements are only planned with EXPLAIN QUERY PLAN, never run.
+    """
+    scans = []
+    for name, sql, params in queries:
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[-1]
+            if detail.startswith("SCAN ") and not any(lookup in detail for lookup in INDEX_LOOKUPS):
+                scans.append((name, detail))
+    return scans
+
+
+def column_indexed(conn, table, column):
+    """Return True when an index of table starts with column."""
+    for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        columns = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+        if columns and columns[0][2] == column:
+            return True
+    return False
@@ -0,0 +1,155 @@
+"""
+Rate limits and write load shedding for the university backend.
+
+RateLimitMiddleware answers a client (X-API-Key header if it is one of partner_keys of the [clients] section, else
+IP address, so a made-up key does not get a fresh bucket) that calls a route more often than its token
+bucket in the [rate_limits] section of config.ini allows with 429, and sheds new writes with 503 while more than
+max_concurrent_writes of the [backpressure] section are in flight. Both answers carry a Retry-After header.
+RateLimiter.configure() is called by the lifespan handler, until then nothing is limited.
+"""
+
+# Import necessary libraries
+import re
+import math
+import time
+import threading
+from collections import OrderedDict
+from starlette.responses import JSONResponse
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# Largest number of (route, client) buckets kept, the least recently used are dropped
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average and bursts of up to `burst` requests."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Take a token and return 0, or return the seconds until a token is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+def route_pattern(path):
+    """Turn a route template such as /orders/{order_code} into a regular expression matching its paths."""
+    parts = re.split(r"(\{[^}]+\})", path)
+    return re.compile("^" + "".join("[^/]+" if part.startswith("{") else re.escape(part) for part in parts) + "$")
+
+
+class RateLimiter:
+    """Per-route token buckets and the write concurrency limit."""
+
+    def __init__(self):
+        self.rules = []
+        self.partner_keys = frozenset()
+        self.max_concurrent_writes = None
+        self.max_write_queue = None
+        self.retry_after = 1
+        self.queue_depth = None
+        self.writes_in_flight = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, config, queue_depth=None):
+        """Read the [rate_limits] and [backpressure] sections, queue_depth returns the depth of the write queue."""
+        self.rules = []
+        if config.has_section('rate_limits'):
+            for route, value in config.items('rate_limits'):
+                method, _, path = route.partition(" ")
+                numbers = value.split()
+                rate = float(numbers[0])
+                burst = float(numbers[1]) if len(numbers) > 1 else max(rate, 1.0)
+                if rate <= 0 or burst < 1:
+                    raise ValueError(f"Rate limit of '{route}' needs a rate above 0 and a burst of at least 1, "
+                                     f"got '{value}'")
+                self.rules.append((method.upper(), route_pattern(path.strip()), f"{method.upper()} {path.strip()}",
+                                   rate, burst))
+        partner_keys = config.get('clients', 'partner_keys', fallback='').split(",")
+        self.partner_keys = frozenset(key.strip() for key in partner_keys if key.strip())
+        self.max_concurrent_writes = config.getint('backpressure', 'max_concurrent_writes', fallback=0) or None
+        self.max_write_queue = config.getint('backpressure', 'max_write_queue', fallback=0) or None
+        self.retry_after = config.getint('backpressure', 'retry_after', fallback=1)
+        self.queue_depth = queue_depth
+        with self._lock:
+            self._buckets.clear()
+
+    def check_rate(self, method, path, client):
+        """Return 0 when the request may pass, or the seconds the client has to wait."""
+        for rule_method, pattern, name, rate, burst in self.rules:
+            if rule_method == method and pattern.match(path):
+                key = (name, client)
+                with self._lock:
+                    bucket = self._buckets.get(key)
+                    if bucket is None:
+                        bucket = self._buckets[key] = TokenBucket(rate, burst)
+                        while len(self._buckets) > MAX_BUCKETS:
+                            self._buckets.popitem(last=False)
+                    else:
+                        self._buckets.move_to_end(key)
+                    return bucket.take()
+        return 0
+
+    def overloaded(self):
+        """Return True when a new write would exceed the concurrency or queue limit."""
+        if self.max_concurrent_writes is not None and self.writes_in_flight >= self.max_concurrent_writes:
+            return True
+        if self.max_write_queue is not None and self.queue_depth is not None:
+            return self.queue_depth() >= self.max_write_queue
+        return False
+
+
+def client_key(scope, partner_keys):
+    """Identify the client by its API key if it is a partner key, otherwise by its IP address."""
+    for name, value in scope.get("headers", ()):
+        if name == b"x-api-key":
+            key = value.decode("latin-1")
+            if key in partner_keys:
+                return "key:" + key
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering over-limit requests with 429 and overload with 503."""
+
+    def __init__(self, app, limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        wait = self.limiter.check_rate(method, scope["path"], client_key(scope, self.limiter.partner_keys))
+        if wait > 0:
+            response = JSONResponse({"detail": "Too many requests"}, status_code=429,
+                                    headers={"Retry-After": str(math.ceil(wait))})
+            await response(scope, receive, send)
+            return
+        if method not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        if self.limiter.overloaded():
+            response = JSONResponse({"detail": "Server is overloaded, retry later"}, status_code=503,
+                                    headers={"Retry-After": str(self.limiter.retry_after)})
+            await response(scope, receive, send)
+            return
+        # The event loop runs one request at a time between awaits, so the counter needs no lock
+        self.limiter.writes_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.writes_in_flight -= 1
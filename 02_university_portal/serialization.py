@@ -0,0 +1,38 @@
+"""
+Fast JSON responses for the university backend.
+
+Rows are encoded to JSON bytes in one step with orjson (or the json module when orjson is missing) and returned as they
+are, so FastAPI does not build and validate a pydantic model per row before encoding it.
+"""
+
+# Import necessary libraries
+import json
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content):
+    """Encode content to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def rows_to_json(rows, columns):
+    """Encode database rows as a JSON array of objects keyed by the column names."""
+    return dumps([dict(zip(columns, row)) for row in rows])
+
+
+class JSONBytesResponse(Response):
+    """JSON response whose content is either already encoded bytes or a plain structure to encode."""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,66 @@
+"""
+Production entry point of the university backend.
+
+Runs uni_backend:app in several uvicorn worker processes, or under gunicorn with uvicorn workers when it is installed.
+create_tables runs in every worker under the SQLite write lock, so they can start together. The ETag versions are kept
+in the database, so the workers see each other's writes however they are started. Defaults come from the [server]
+section of config.ini.
+
+Usage:
+    python serve.py --workers 4
+"""
+
+# Import necessary libraries
+import os
+import sys
+import argparse
+import configparser
+import uvicorn
+
+APP = "uni_backend:app"
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class GunicornServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("loglevel", args.log_level)
+
+        def load(self):
+            from uni_backend import app
+            return app
+
+    GunicornServer().run()
+
+
+def main(argv=None):
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    parser = argparse.ArgumentParser(description="Run the university backend with several workers.")
+    parser.add_argument("--host", default=config.get('server', 'host', fallback='127.0.0.1'))
+    parser.add_argument("--port", type=int, default=config.getint('server', 'port', fallback=8000))
+    parser.add_argument("--workers", type=int, default=config.getint('server', 'workers', fallback=os.cpu_count() or 1))
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"],
+                        default=config.get('server', 'server', fallback='uvicorn'))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    if args.server == "gunicorn":
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            parser.error("gunicorn is not installed, use --server uvicorn")
+        run_gunicorn(args)
+    else:
+        uvicorn.run(APP, host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
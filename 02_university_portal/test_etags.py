@@ -0,0 +1,50 @@
+"""
+Tests of the ETags of the university backend.
+
+An unchanged list is answered with 304 to a request carrying its ETag in If-None-Match, while another page, another
+filter, or a write to the table, by this worker or by another process through change_versions, gives a new ETag.
+"""
+
+# Import necessary libraries
+import sqlite3
+from etags import ChangeVersions
+from conftest import new_student
+
+
+def test_unchanged_lists_are_not_sent_again(client):
+    assert client.post("/register_student/", json=new_student("Ada")).status_code == 200
+    first = client.get("/students/")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    unchanged = client.get("/students/", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304 and unchanged.headers["ETag"] == etag and unchanged.content == b""
+    # Weak comparison, lists of tags and * match too
+    assert client.get("/students/", headers={"If-None-Match": etag.removeprefix("W/")}).status_code == 304
+    assert client.get("/students/", headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert client.get("/students/", headers={"If-None-Match": "*"}).status_code == 304
+    # Another page or filter is another list
+    assert client.get("/students/", params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/students/", params={"nationality": "UK"}, headers={"If-None-Match": etag}).status_code == 200
+    # A write to another table keeps the list unchanged
+    assert client.post("/add_lesson/", json={"name": "Optics", "field_of_studying": "Physics"}).status_code == 200
+    assert client.get("/students/", headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.post("/register_student/", json=new_student("Enrico")).status_code == 200
+    changed = client.get("/students/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert [student["name"] for student in changed.json()] == ["Ada", "Enrico"]
+
+
+def test_writes_of_other_processes_change_the_etag(client):
+    assert client.post("/add_lesson/", json={"name": "Optics", "field_of_studying": "Physics"}).status_code == 200
+    etag = client.get("/lessons/").headers["ETag"]
+    assert client.get("/lessons/", headers={"If-None-Match": etag}).status_code == 304
+    # Another worker process adds a lesson
+    conn = sqlite3.connect("university.db")
+    conn.execute("INSERT INTO lessons (name, field_of_studying) VALUES ('Genetics', 'Biology')")
+    ChangeVersions.bump(conn, "lessons")
+    conn.commit()
+    conn.close()
+    changed = client.get("/lessons/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert [lesson["name"] for lesson in changed.json()] == ["Optics", "Genetics"]
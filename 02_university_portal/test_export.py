@@ -0,0 +1,41 @@
+"""
+Tests of the streaming export of the university backend.
+
+/export/{table} streams every row of a table in id order, read chunk by chunk, as NDJSON or as CSV with a header line.
+"""
+
+# Import necessary libraries
+import csv
+import io
+import json
+import uni_backend
+from conftest import new_student
+
+
+def test_students_are_exported_in_chunks(client, monkeypatch):
+    monkeypatch.setattr(uni_backend, "EXPORT_CHUNK_SIZE", 2)
+    names = ["Ada", "Alan, Jr.", 'Grace "Amazing"', "Enrico", "Marie"]
+    for name in names:
+        assert client.post("/register_student/", json=new_student(name)).status_code == 200
+
+    with client.stream("GET", "/export/students") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.headers["content-disposition"] == 'attachment; filename="students.ndjson"'
+        rows = [json.loads(line) for line in response.iter_lines() if line]
+    assert [row["id"] for row in rows] == [1, 2, 3, 4, 5]
+    assert rows[1] == dict(new_student("Alan, Jr."), id=2)
+
+    response = client.get("/export/students", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == uni_backend.EXPORT_COLUMNS["students"]
+    assert [row[1] for row in rows[1:]] == names
+
+
+def test_export_requests_are_checked(client):
+    assert client.post("/add_lesson/", json={"name": "Optics", "field_of_studying": "Physics"}).status_code == 200
+    assert client.get("/export/lessons").text == '{"id": 1, "name": "Optics", "field_of_studying": "Physics"}\n'
+    assert client.get("/export/change_versions").status_code == 404
+    assert client.get("/export/lessons", params={"format": "xml"}).status_code == 400
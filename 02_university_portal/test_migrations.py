@@ -0,0 +1,59 @@
+"""
+Tests of the schema migrations of the university backend.
+
+A database written by the backend before it had migrations is brought to the latest schema version with its students
+kept: birth dates in the old formats become ISO 8601 dates, ages given as a number of years are kept in legacy_age, and
+a value that is neither stops the migration without changing anything.
+"""
+
+# Import necessary libraries
+import sqlite3
+import pytest
+import uni_backend
+from migrate import schema_version
+
+V1_STUDENTS = [
+    ("Ada", "Lovelace", "1990-01-18", "Female", "UK", "Mathematics"),
+    ("Alan", "Turing", "23/06/1992", "Male", "UK", "Computer Science"),
+    ("Enrico", "Fermi", "21", "Male", "Italy", "Physics"),
+    ("Marie", "Curie", None, "Female", "Poland", "Physics"),
+]
+
+
+def create_v1_database(ages=()):
+    conn = sqlite3.connect("university.db")
+    uni_backend.create_schema(conn)
+    conn.executemany("INSERT INTO students (name, surname, age, sex, nationality, field_of_studying) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", V1_STUDENTS + list(ages))
+    # A deleted student, whose id is never handed out again
+    conn.execute("DELETE FROM students WHERE id = 4")
+    conn.commit()
+    conn.close()
+
+
+def test_populated_v1_database_is_migrated(app_folder):
+    create_v1_database()
+    uni_backend.create_tables()
+    conn = sqlite3.connect("university.db")
+    assert schema_version(conn) == len(uni_backend.MIGRATIONS)
+    assert conn.execute("SELECT id, age, legacy_age FROM students ORDER BY id").fetchall() == [
+        (1, "1990-01-18", None), (2, "1992-06-23", None), (3, None, "21")]
+    # The rebuilt table keeps its search index, statistics and id counter
+    assert conn.execute("SELECT rowid FROM students_fts WHERE students_fts MATCH 'Fermi'").fetchall() == [(3,)]
+    assert conn.execute("SELECT count FROM student_stats WHERE dimension = 'nationality' AND value = 'UK'"
+                        ).fetchone() == (2,)
+    conn.execute("INSERT INTO students (name, age) VALUES ('Emmy', '1982-03-23')")
+    assert conn.execute("SELECT MAX(id) FROM students").fetchone() == (5,)
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO students (name, age) VALUES ('Niels', '21')")
+    conn.close()
+
+
+def test_unparseable_ages_stop_the_migration(app_folder):
+    create_v1_database([("Lise", "Meitner", "twenty", "Female", "Austria", "Physics")])
+    with pytest.raises(RuntimeError, match="student 5: 'twenty'"):
+        uni_backend.create_tables()
+    conn = sqlite3.connect("university.db")
+    assert schema_version(conn) == 0
+    assert conn.execute("SELECT age FROM students WHERE id = 3").fetchone() == ("21",)
+    conn.close()
@@ -0,0 +1,49 @@
+"""
+Tests of the paginated list endpoints of the university backend.
+
+The lists are ordered by id and cut into pages of at most limit rows. X-Next-Cursor is the after_id of the next page,
+and the last page has no such header. The filters apply to every page.
+"""
+
+# Import necessary libraries
+from conftest import new_student
+
+
+def fetch_all_pages(client, path, **params):
+    pages = []
+    after_id = 0
+    while True:
+        response = client.get(path, params=dict(params, after_id=after_id))
+        assert response.status_code == 200
+        pages.append(response.json())
+        if "X-Next-Cursor" not in response.headers:
+            return pages
+        after_id = int(response.headers["X-Next-Cursor"])
+
+
+def test_students_are_paged_by_id(client):
+    names = [f"Student{i}" for i in range(7)]
+    for i, name in enumerate(names):
+        field = "Physics" if i % 2 else "Chemistry"
+        assert client.post("/register_student/", json=new_student(name, field_of_studying=field)).status_code == 200
+    pages = fetch_all_pages(client, "/students/", limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [student["name"] for page in pages for student in page] == names
+    # A last page that is exactly full has no next cursor either
+    assert [len(page) for page in fetch_all_pages(client, "/students/", limit=7)] == [7]
+    pages = fetch_all_pages(client, "/students/", limit=2, field_of_studying="Physics")
+    assert [student["name"] for page in pages for student in page] == ["Student1", "Student3", "Student5"]
+    assert client.get("/students/", params={"after_id": 100}).json() == []
+    assert client.get("/students/", params={"limit": 0}).status_code == 422
+    assert client.get("/students/", params={"limit": 1001}).status_code == 422
+
+
+def test_lessons_are_paged_by_id(client):
+    for i in range(5):
+        lesson = {"name": f"Lesson{i}", "field_of_studying": "Physics" if i < 3 else "Biology"}
+        assert client.post("/add_lesson/", json=lesson).status_code == 200
+    pages = fetch_all_pages(client, "/lessons/", limit=2)
+    assert [[lesson["name"] for lesson in page] for page in pages] == [["Lesson0", "Lesson1"], ["Lesson2", "Lesson3"],
+                                                                       ["Lesson4"]]
+    pages = fetch_all_pages(client, "/lessons/", limit=2, field_of_studying="Biology")
+    assert [lesson["name"] for page in pages for lesson in page] == ["Lesson3", "Lesson4"]
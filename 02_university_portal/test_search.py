@@ -0,0 +1,33 @@
+"""
+Tests of the student search of the university backend.
+
+Every word of the query has to match the start of a word of the name, surname, nationality or field of studying, and a
+query made of FTS5 syntax is searched as plain words instead of failing.
+"""
+
+# Import necessary libraries
+import pytest
+from conftest import new_student
+
+HOSTILE_QUERIES = ['"', 'ada"', '"" OR', "*", "NOT ada", "NEAR(ada turing)", "(ada", "name:ada", "-ada", "^ada",
+                   "'; DROP TABLE students"]
+
+
+def test_search_students(client):
+    for student in (new_student("Ada", "UK", "Mathematics"), new_student("Adam"), new_student("Enrico")):
+        assert client.post("/register_student/", json=student).status_code == 200
+    found = client.get("/search/students", params={"q": "ada"}).json()
+    assert sorted(student["name"] for student in found) == ["Ada", "Adam"]
+    assert found[0].keys() == {"id", *new_student("Ada")}
+    found = client.get("/search/students", params={"q": "AD phys"}).json()
+    assert [student["name"] for student in found] == ["Adam"]
+    assert len(client.get("/search/students", params={"q": "student", "limit": 2, "offset": 2}).json()) == 1
+    assert client.get("/search/students", params={"q": " "}).status_code == 400
+
+
+@pytest.mark.parametrize("query", HOSTILE_QUERIES)
+def test_hostile_queries_are_plain_words(client, query):
+    assert client.post("/register_student/", json=new_student("Ada")).status_code == 200
+    response = client.get("/search/students", params={"q": query})
+    assert response.status_code == 200
+    assert {student["name"] for student in response.json()} <= {"Ada"}
@@ -0,0 +1,37 @@
+"""
+Tests of the student statistics of the university backend.
+
+/stats/students counts the students per field of studying, nationality and sex from the summary kept by the triggers
+of the students table, and shares the ETag version of the students list.
+"""
+
+# Import necessary libraries
+import sqlite3
+from conftest import new_student
+
+
+def test_student_stats_follow_the_writes(client):
+    assert client.get("/stats/students").json() == {"field_of_studying": {}, "nationality": {}, "sex": {}}
+    for student in (new_student("Ada", "UK", "Mathematics"), new_student("Enrico"), new_student("Laura")):
+        assert client.post("/register_student/", json=student).status_code == 200
+    response = client.get("/stats/students")
+    assert response.json() == {"field_of_studying": {"Physics": 2, "Mathematics": 1},
+                               "nationality": {"Italy": 2, "UK": 1},
+                               "sex": {"Female": 3}}
+    etag = response.headers["ETag"]
+    assert client.get("/stats/students", headers={"If-None-Match": etag}).status_code == 304
+
+    # Changes made straight in the database are counted by the triggers too
+    conn = sqlite3.connect("university.db")
+    conn.execute("UPDATE students SET nationality = 'France' WHERE name = 'Ada'")
+    conn.execute("DELETE FROM students WHERE name = 'Laura'")
+    conn.commit()
+    conn.close()
+    assert client.get("/stats/students").json() == {"field_of_studying": {"Mathematics": 1, "Physics": 1},
+                                                    "nationality": {"France": 1, "Italy": 1},
+                                                    "sex": {"Female": 2}}
+
+    assert client.post("/register_student/", json=new_student("Marie", "Poland")).status_code == 200
+    changed = client.get("/stats/students", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["nationality"] == {"France": 1, "Italy": 1, "Poland": 1}
@@ -1,19 +1,103 @@
-import uvicorn
-from fastapi import FastAPI, HTTPException
+import io
+import csv
+import json
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from contextlib import asynccontextmanager
 import sqlite3
+from datetime import date, datetime
 import logging
+import configparser
+from logging_setup import setup_logging, stop_logging, ACCESS_LOGGER
+from metrics import REGISTRY, MetricsMiddleware, InstrumentedConnection
+from serialization import JSONBytesResponse, rows_to_json
+from etags import ChangeVersions, etag_matches, not_modified
+from rate_limit import RateLimiter, RateLimitMiddleware
+from compression import Compressor, CompressionMiddleware
+from startup_profile import StartupTimer
+from migrate import migrate
 
-app = FastAPI()
-logging.basicConfig(filename="file.log", level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+access_log = logging.getLogger(ACCESS_LOGGER)
+# Change versions behind the ETags of the list endpoints, created by the lifespan handler
+versions = None
+# Rate limits of the write endpoints and response compression, configured by the lifespan handler
+rate_limiter = RateLimiter()
+compressor = Compressor()
+# Durations of the startup phases of this process, logged by the lifespan handler
+startup_timer = None
 
-def get_connection():
-    return sqlite3.connect('university.db')
+# Page sizes for the list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_SEARCH_RESULTS = 100
 
-# Create tables if they don't exist
-def create_tables():
-    conn = get_connection()
+# Columns of the students table counted in the student_stats summary
+STATS_DIMENSIONS = ("field_of_studying", "nationality", "sex")
+
+# Rows read from the cursor per chunk by the export endpoints, and the exportable columns of each table
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_COLUMNS = {
+    "students": ["id", "name", "surname", "age", "sex", "nationality", "field_of_studying"],
+    "lessons": ["id", "name", "field_of_studying"],
+}
+
+def get_connection(check_same_thread=True):
+    return sqlite3.connect('university.db', check_same_thread=check_same_thread, factory=InstrumentedConnection)
+
+# Indexes and triggers of the students table, dropped with it when the table is rebuilt
+def create_student_indexes_and_triggers(cursor):
+    # Indexes backing the filtered, id ordered list queries
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_field ON students (field_of_studying, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_nationality ON students (nationality, id)')
+    # Keep the full-text index in sync
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS students_fts_insert AFTER INSERT ON students BEGIN
+            INSERT INTO students_fts(rowid, name, surname, nationality, field_of_studying)
+            VALUES (new.id, new.name, new.surname, new.nationality, new.field_of_studying);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS students_fts_delete AFTER DELETE ON students BEGIN
+            INSERT INTO students_fts(students_fts, rowid, name, surname, nationality, field_of_studying)
+            VALUES ('delete', old.id, old.name, old.surname, old.nationality, old.field_of_studying);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS students_fts_update AFTER UPDATE ON students BEGIN
+            INSERT INTO students_fts(students_fts, rowid, name, surname, nationality, field_of_studying)
+            VALUES ('delete', old.id, old.name, old.surname, old.nationality, old.field_of_studying);
+            INSERT INTO students_fts(rowid, name, surname, nationality, field_of_studying)
+            VALUES (new.id, new.name, new.surname, new.nationality, new.field_of_studying);
+        END
+    ''')
+    # Keep the student_stats summary up to date
+    increments = "".join(f'''
+            INSERT INTO student_stats VALUES ('{dimension}', coalesce(new.{dimension}, ''), 1)
+            ON CONFLICT DO UPDATE SET count = count + 1;''' for dimension in STATS_DIMENSIONS)
+    decrements = "".join(f'''
+            UPDATE student_stats SET count = count - 1
+            WHERE dimension = '{dimension}' AND value = coalesce(old.{dimension}, '');''' for dimension in STATS_DIMENSIONS)
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS student_stats_insert AFTER INSERT ON students BEGIN{increments}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS student_stats_delete AFTER DELETE ON students BEGIN{decrements}
+            DELETE FROM student_stats WHERE count <= 0;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS student_stats_update
+        AFTER UPDATE OF {", ".join(STATS_DIMENSIONS)} ON students BEGIN{decrements}{increments}
+            DELETE FROM student_stats WHERE count <= 0;
+        END
+    ''')
+
+# Schema version 1, everything the backend created before it had migrations. Every statement is idempotent, so a
+# database created by an older backend is brought to version 1 as it is
+def create_schema(conn):
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS students (
@@ -33,13 +117,150 @@ def create_tables():
             field_of_studying TEXT
         )
     ''')
-    conn.commit()
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lessons_field ON lessons (field_of_studying, id)')
+    # Full-text index over the students
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='students_fts'")
+    fts_exists = cursor.fetchone()
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+            name, surname, nationality, field_of_studying,
+            content='students', content_rowid='id'
+        )
+    ''')
+    # Index the students registered before the search table existed
+    if not fts_exists:
+        cursor.execute("INSERT INTO students_fts(students_fts) VALUES ('rebuild')")
+    # Number of students per value of every column in STATS_DIMENSIONS
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='student_stats'")
+    stats_exist = cursor.fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS student_stats (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, value)
+        ) WITHOUT ROWID
+    ''')
+    create_student_indexes_and_triggers(cursor)
+    # Count the students registered before the summary table existed, the GROUP BY runs over the indexes
+    if not stats_exist:
+        for dimension in STATS_DIMENSIONS:
+            cursor.execute(f'''
+                INSERT INTO student_stats (dimension, value, count)
+                SELECT ?, coalesce({dimension}, ''), COUNT(*) FROM students GROUP BY coalesce({dimension}, '')
+            ''', (dimension,))
+    ChangeVersions.create_table(conn)
+
+# Birth dates written by hand before the API checked them, tried in order after ISO 8601
+LEGACY_DATE_FORMATS = ("%d/%m/%Y", "%d.%m.%Y", "%d-%m-%Y", "%Y/%m/%d")
+
+def normalize_date(text):
+    if text is None:
+        return None
+    text = str(text).strip()
+    try:
+        # Also accepts a date with a time, like '1990-01-18 00:00:00'
+        return datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        pass
+    for date_format in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+# Schema version 2: the age column holds ISO 8601 birth dates (YYYY-MM-DD), enforced by a CHECK constraint. SQLite
+# cannot change the type of a column, so the table is rebuilt with the same ids and its indexes and triggers recreated.
+# Ages written as a number of years cannot be turned into a birth date, they are kept as they were in legacy_age with
+# a NULL age. Any other value that is not a date stops the migration, nothing is changed until it is fixed by hand
+def store_age_as_date(conn):
+    cursor = conn.cursor()
+    conn.create_function("normalize_date", 1, normalize_date, deterministic=True)
+    cursor.execute("SELECT id, age FROM students WHERE age IS NOT NULL AND normalize_date(age) IS NULL")
+    not_dates = cursor.fetchall()
+    unparseable = [(student_id, age) for student_id, age in not_dates if not str(age).strip().isdigit()]
+    if unparseable:
+        listed = ", ".join(f"student {student_id}: '{age}'" for student_id, age in unparseable[:10])
+        raise RuntimeError(f"{len(unparseable)} ages are neither a date nor a number of years ({listed}), "
+                           f"fix them before starting the backend")
+    cursor.execute('''
+        CREATE TABLE students_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            surname TEXT,
+            age DATE CHECK (age IS NULL OR age IS date(age)),
+            sex TEXT,
+            nationality TEXT,
+            field_of_studying TEXT,
+            legacy_age TEXT
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO students_new (id, name, surname, age, sex, nationality, field_of_studying, legacy_age)
+        SELECT id, name, surname, normalize_date(age), sex, nationality, field_of_studying,
+               CASE WHEN normalize_date(age) IS NULL THEN age END
+        FROM students
+    ''')
+    if not_dates:
+        logging.warning(f"{len(not_dates)} ages are a number of years rather than a birth date, they were moved to "
+                        f"the legacy_age column.")
+    # Ids of deleted students are never handed out again, keep the AUTOINCREMENT counter
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name='students'")
+    sequence = cursor.fetchone()
+    cursor.execute('DROP TABLE students')
+    cursor.execute('ALTER TABLE students_new RENAME TO students')
+    if sequence is not None:
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name='students'")
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('students', ?)", sequence)
+    create_student_indexes_and_triggers(cursor)
+
+# Schema migrations in order, PRAGMA user_version of the database counts the ones applied. Append new ones at the end
+# and never change one that was released
+MIGRATIONS = [
+    ("students, lessons, search index, statistics and change versions", create_schema),
+    ("ages stored as ISO 8601 dates", store_age_as_date),
+]
+
+# Create or migrate the schema. Every worker runs this at startup, an up to date database is not locked at all
+def create_tables():
+    conn = get_connection()
+    # WAL lets readers run while a worker writes
+    conn.execute('PRAGMA journal_mode=WAL')
+    migrate(conn, MIGRATIONS, CHECKED_QUERIES)
     conn.close()
 
+# Every worker reads the config, starts logging and applies the schema here rather than at import time
+@asynccontextmanager
+async def lifespan(app):
+    global versions, startup_timer
+    startup_timer = StartupTimer()
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    log_listener = setup_logging("file.log",
+                                 level=config.get('logging', 'level', fallback='INFO'),
+                                 access_sample_rate=config.getfloat('logging', 'access_sample_rate', fallback=1.0))
+    startup_timer.mark("config and logging")
+    create_tables()
+    startup_timer.mark("schema")
+    versions = ChangeVersions('university.db')
+    rate_limiter.configure(config)
+    compressor.configure(config)
+    startup_timer.mark("versions and middleware")
+    startup_timer.log()
+    yield
+    versions.close()
+    stop_logging(log_listener)
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CompressionMiddleware, compressor=compressor)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+app.add_middleware(MetricsMiddleware)
+
 class Student(BaseModel):
     name: str
     surname: str
-    age: str
+    age: date
     sex: str
     nationality: str
     field_of_studying: str
@@ -48,9 +269,58 @@ class Lesson(BaseModel):
     name: str
     field_of_studying: str
 
-@app.on_event("startup")
-async def startup_event():
-    create_tables()
+STUDENT_COLUMNS = list(Student.model_fields)
+LESSON_COLUMNS = list(Lesson.model_fields)
+
+# Query of one page of rows ordered by id, its parameters are the cursor, a value per filter column and the limit
+def page_query(table, columns, filter_columns):
+    conditions = ["id > ?"] + [f"{column} = ?" for column in filter_columns]
+    return f'''
+        SELECT id, {", ".join(columns)} FROM {table}
+        WHERE {" AND ".join(conditions)}
+        ORDER BY id
+        LIMIT ?
+    '''
+
+SEARCH_STUDENTS = f'''
+    SELECT {", ".join("s." + column for column in ["id"] + STUDENT_COLUMNS)}
+    FROM students_fts JOIN students s ON s.id = students_fts.rowid
+    WHERE students_fts MATCH ?
+    ORDER BY students_fts.rank
+    LIMIT ? OFFSET ?
+'''
+
+# List and search queries that have to go through an index, checked whenever the schema changes
+CHECKED_QUERIES = [
+    ("students page", page_query("students", STUDENT_COLUMNS, []), (0, 100)),
+    ("students page by field", page_query("students", STUDENT_COLUMNS, ["field_of_studying"]), (0, "Physics", 100)),
+    ("students page by nationality", page_query("students", STUDENT_COLUMNS, ["nationality"]), (0, "Italy", 100)),
+    ("students page by field and nationality",
+     page_query("students", STUDENT_COLUMNS, ["field_of_studying", "nationality"]), (0, "Physics", "Italy", 100)),
+    ("lessons page", page_query("lessons", LESSON_COLUMNS, []), (0, 100)),
+    ("lessons page by field", page_query("lessons", LESSON_COLUMNS, ["field_of_studying"]), (0, "Physics", 100)),
+    ("student search", SEARCH_STUDENTS, ('"ada"*', 20, 0)),
+]
+
+# Fetch one page of rows ordered by id, starting after the given cursor
+def fetch_page(table, columns, after_id, limit, filters):
+    filters = {column: value for column, value in filters.items() if value is not None}
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(page_query(table, columns, filters), [after_id, *filters.values(), limit + 1])
+    rows = cursor.fetchall()
+    conn.close()
+    # One extra row is read to know whether there is a next page
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+# Turn free text into an FTS5 query matching every word as a prefix
+def fts_match_expression(text):
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+def set_next_cursor(response, next_cursor):
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
 
 @app.post("/register_student/")
 def register_student(student: Student):
@@ -59,9 +329,12 @@ def register_student(student: Student):
     cursor.execute('''
         INSERT INTO students (name, surname, age, sex, nationality, field_of_studying)
         VALUES (?, ?, ?, ?, ?, ?)
-    ''', (student.name, student.surname, student.age, student.sex, student.nationality, student.field_of_studying))
+    ''', (student.name, student.surname, student.age.isoformat(), student.sex, student.nationality,
+          student.field_of_studying))
+    version = versions.bump(conn, "students")
     conn.commit()
     conn.close()
+    versions.committed("students", version)
     return {"message": "Student registered successfully"}
 
 @app.post("/add_lesson/")
@@ -72,68 +345,145 @@ def add_lesson(lesson: Lesson):
         INSERT INTO lessons (name, field_of_studying)
         VALUES (?, ?)
     ''', (lesson.name, lesson.field_of_studying))
+    version = versions.bump(conn, "lessons")
     conn.commit()
     conn.close()
+    versions.committed("lessons", version)
     return {"message": "Lesson added successfully"}
 
+# The list endpoints encode the rows straight to JSON, the response models only document them
 @app.get("/students/", response_model=List[Student])
-def get_students():
+def get_students(request: Request,
+                 after_id: int = 0,
+                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                 field_of_studying: Optional[str] = None,
+                 nationality: Optional[str] = None):
+    versions.refresh()
+    etag = versions.etag("students", after_id, limit, field_of_studying, nationality)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM students
-        ''')
-        students_data = cursor.fetchall()
-        conn.close()
-
-        # Convert fetched data to list of Student objects
-        students = []
-        for student_data in students_data:
-            student = Student(
-                name=student_data[1],
-                surname=student_data[2],
-                age=student_data[3],
-                sex=student_data[4],
-                nationality=student_data[5],
-                field_of_studying=student_data[6]
-            )
-            students.append(student)
-
-        if not students:
+        students_data, next_cursor = fetch_page(
+            "students", STUDENT_COLUMNS, after_id, limit,
+            {"field_of_studying": field_of_studying, "nationality": nationality}
+        )
+        if not students_data:
             logging.warning("No students found in the database")
-            return []  # Return empty list if no students found
-        return students
+        response = JSONBytesResponse(rows_to_json((row[1:] for row in students_data), STUDENT_COLUMNS),
+                                     headers={"ETag": etag})
+        set_next_cursor(response, next_cursor)
+        return response
     except Exception as e:
         logging.error(f"Error fetching students: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch students data")
 
 
 @app.get("/lessons/", response_model=List[Lesson])
-def get_lessons():
+def get_lessons(request: Request,
+                after_id: int = 0,
+                limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                field_of_studying: Optional[str] = None):
+    versions.refresh()
+    etag = versions.etag("lessons", after_id, limit, field_of_studying)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        lessons_datas, next_cursor = fetch_page(
+            "lessons", LESSON_COLUMNS, after_id, limit,
+            {"field_of_studying": field_of_studying}
+        )
+        response = JSONBytesResponse(rows_to_json((row[1:] for row in lessons_datas), LESSON_COLUMNS),
+                                     headers={"ETag": etag})
+        set_next_cursor(response, next_cursor)
+        return response
+
+    except Exception as e:
+        logging.error(f"Error fetching lessons: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch lessons data")
+
+@app.get("/stats/students")
+def get_student_stats(request: Request):
+    # The summary changes with every registration, so it shares the ETag version of the students table
+    versions.refresh()
+    etag = versions.etag("students", "stats")
+    if etag_matches(request, etag):
+        return not_modified(etag)
     try:
         conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM lessons
-        ''')
-        lessons_datas = cursor.fetchall()
+        cursor.execute("SELECT dimension, value, count FROM student_stats ORDER BY dimension, count DESC, value")
+        rows = cursor.fetchall()
         conn.close()
-        all_lessons = []
-        for lesson_data in lessons_datas:
-            lesson = Lesson(
-                name=lesson_data[1],
-                field_of_studying=lesson_data[2]
-            )
-            all_lessons.append(lesson)
-
-        if not all_lessons:
-            return []
-        return all_lessons
+    except Exception as e:
+        logging.error(f"Error fetching student statistics: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch student statistics")
+    stats = {dimension: {} for dimension in STATS_DIMENSIONS}
+    for dimension, value, count in rows:
+        stats[dimension][value] = count
+    return JSONBytesResponse(stats, headers={"ETag": etag})
 
+@app.get("/search/students")
+def search_students(q: str,
+                    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+                    offset: int = Query(0, ge=0)):
+    match = fts_match_expression(q)
+    if not match:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(SEARCH_STUDENTS, (match, limit, offset))
+        rows = cursor.fetchall()
+        conn.close()
+        return JSONBytesResponse(rows_to_json(rows, ["id"] + STUDENT_COLUMNS))
     except Exception as e:
-        logging.error(f"Error fetching lessons: {e}")
-        raise HTTPException(status_code=500, detail="Failed to fetch lessons data")
+        logging.error(f"Error searching students: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search students")
+
+
+# Yield a table chunk by chunk so memory use does not grow with its size
+def export_rows(table, export_format):
+    columns = EXPORT_COLUMNS[table]
+    # The streaming response advances this generator from worker threads
+    conn = get_connection(check_same_thread=False)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+        if export_format == "csv":
+            yield ",".join(columns) + "\r\n"
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            if export_format == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+    except Exception as e:
+        logging.error(f"Error exporting {table}: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+@app.get("/export/{table}")
+def export_table(table: str, format: str = "ndjson"):
+    if table not in EXPORT_COLUMNS:
+        raise HTTPException(status_code=404, detail="Unknown table")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Format must be ndjson or csv")
+    access_log.info(f"Exporting {table} as {format}")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+    return StreamingResponse(export_rows(table, format), media_type=media_type, headers=headers)
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
+    # Only needed to run this file directly, the servers of serve.py import it themselves
+    import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
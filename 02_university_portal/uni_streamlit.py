@@ -1,28 +1,55 @@
 import requests
 import datetime
-import pandas as pd
 import streamlit as st
+from api_client import ApiError, fetch_json, send
 
 
 # Backend API URL
 backend_url = "http://localhost:8000"
+page_size = 1000
+
+# The list endpoints are paginated, follow the X-Next-Cursor header until the last page
+def fetch_all_pages(path):
+    items = []
+    params = {"limit": page_size}
+    while True:
+        try:
+            page, headers = fetch_json(backend_url, path, dict(params))
+        except (ApiError, requests.RequestException):
+            return None
+        items.extend(page)
+        next_cursor = headers.get("x-next-cursor")
+        if next_cursor is None:
+            return items
+        params["after_id"] = next_cursor
 
 def fetch_students_data():
-    response = requests.get(f"{backend_url}/students/")
-    if response.status_code == 200:
-        students = response.json()
-        return students
-    else:
+    students = fetch_all_pages("/students/")
+    if students is None:
         st.error("Failed to fetch students data")
+    return students
 
 
 def fetch_lessons_data():
-    response = requests.get(f"{backend_url}/lessons/")
-    if response.status_code == 200:
-        lessons = response.json()
-        return lessons
-    else:
+    lessons = fetch_all_pages("/lessons/")
+    if lessons is None:
         st.error("Failed to fetch lessons data")
+    return lessons
+
+# Counts per field of studying, nationality and sex, computed by the backend instead of from the full student list
+def show_statistics():
+    st.subheader("Student Statistics")
+    try:
+        stats, _ = fetch_json(backend_url, "/stats/students")
+    except (ApiError, requests.RequestException):
+        st.error("Failed to fetch student statistics")
+        return
+    for dimension, title in (("field_of_studying", "Field of Studying"), ("nationality", "Nationality"), ("sex", "Sex")):
+        st.markdown(f"**{title}**")
+        if stats[dimension]:
+            st.bar_chart({"students": stats[dimension]})
+        else:
+            st.write("No students found")
 
 def register_student():
     current_year = datetime.datetime.now().year
@@ -49,7 +76,7 @@ def register_student():
             'field_of_studying': field_of_studying
         }
 
-        response = requests.post(f"{backend_url}/register_student/", json=student_data)
+        response = send(backend_url, "POST", "/register_student/", json=student_data)
         if response.status_code == 200:
             st.success("Student registered successfully")
         else:
@@ -60,7 +87,8 @@ def register_student():
 def main():
     st.title("University Portal Simulator")
 
-    page = st.sidebar.selectbox("Select Page", ["Register Student", "Add Lesson", "View Students", "View Lessons"])
+    page = st.sidebar.selectbox("Select Page", ["Register Student", "Add Lesson", "View Students", "View Lessons",
+                                                "Statistics"])
 
     if page == "Register Student":
         register_student()
@@ -74,15 +102,14 @@ def main():
                 "name": name,
                 "field_of_studying": field_of_studying
             }
-            response = requests.post(f"{backend_url}/add_lesson/", json=lesson_data)
+            response = send(backend_url, "POST", "/add_lesson/", json=lesson_data)
             if response.status_code == 200:
                 st.success("Lesson added successfully")
             else:
                 st.error("Failed to add lesson")
     elif page == "View Students":
-        response = requests.get(f"{backend_url}/students/")
-        if response.status_code == 200:
-            students = fetch_students_data()
+        students = fetch_students_data()
+        if students is not None:
             if not students:
                 st.markdown("""
                                 <div style="padding: 10px; background-color: #ADD8E6; border-radius: 5px;">
@@ -90,14 +117,13 @@ def main():
                                 </div>
                                 """, unsafe_allow_html=True)
             else:
+                # pandas takes a third of a second to import, so it is only loaded by the views showing a table
+                import pandas as pd
                 df_students = pd.DataFrame(students)
                 st.dataframe(df_students)
-        else:
-            st.error("Failed to fetch students data")
     elif page == "View Lessons":
-        response = requests.get(f"{backend_url}/lessons/")
-        if response.status_code == 200:
-            lessons = fetch_lessons_data()
+        lessons = fetch_lessons_data()
+        if lessons is not None:
             if not lessons:
                 st.markdown("""
                                 <div style="padding: 10px; background-color: #708090; border-radius: 5px;">
@@ -105,10 +131,11 @@ def main():
                                 </div>
                                 """, unsafe_allow_html=True)
             else:
+                import pandas as pd
                 df_lessons = pd.DataFrame(lessons)
                 st.dataframe(df_lessons)
-        else:
-            st.error("Failed to fetch lessons data")
+    elif page == "Statistics":
+        show_statistics()
 
 if __name__ == "__main__":
     main()
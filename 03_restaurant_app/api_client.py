@@ -0,0 +1,106 @@
+"""
+Happy Restaurant API Client
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module is the single way the Streamlit frontend talks to the backend. Streamlit reruns the whole script on every
+widget interaction, so the module keeps the expensive parts across reruns:
+- one requests.Session with a connection pool, kept by st.cache_resource, so TCP connections are reused
+- read results kept by st.cache_data for CACHE_TTL seconds and cleared after every write
+- the ETag of the MAX_VALIDATED most recent reads, sent back as If-None-Match so an unchanged resource costs a 304
+
+Usage:
+    data, headers = fetch_json(base_url, "/orders/A1")
+    response = send(base_url, "POST", "/orders/", json=payload)
+"""
+
+# Import necessary libraries
+import threading
+from collections import OrderedDict
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+# Seconds a read result is reused before the backend is asked again
+CACHE_TTL = 30
+# Seconds to wait for the backend before giving up
+REQUEST_TIMEOUT = 10
+# Largest number of reads whose ETag and body are kept for revalidation, the least recently used are dropped
+MAX_VALIDATED = 256
+
+
+class ApiError(Exception):
+    """Raised for a non-2xx answer so that st.cache_data never caches a failed read."""
+
+    def __init__(self, status_code, detail=None):
+        super().__init__(f"Backend answered with status {status_code}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ApiClient:
+    """Pooled HTTP session that revalidates reads with their ETag."""
+
+    def __init__(self, base_url, pool_size=10, max_validated=MAX_VALIDATED):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.max_validated = max_validated
+        self._validated = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_json(self, path, params=None):
+        key = (path, tuple(sorted((params or {}).items())))
+        with self._lock:
+            cached = self._validated.get(key)
+            if cached:
+                self._validated.move_to_end(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = self.session.get(self.base_url + path, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and cached:
+            return cached[1], cached[2]
+        if not response.ok:
+            raise ApiError(response.status_code, response.text)
+        data = response.json()
+        result_headers = {name.lower(): value for name, value in response.headers.items()}
+        etag = response.headers.get("ETag")
+        if etag:
+            with self._lock:
+                self._validated[key] = (etag, data, result_headers)
+                self._validated.move_to_end(key)
+                while len(self._validated) > self.max_validated:
+                    self._validated.popitem(last=False)
+        return data, result_headers
+
+    def forget(self):
+        """Drop the kept reads, after a write their ETags no longer match anyway."""
+        with self._lock:
+            self._validated.clear()
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        return self.session.request(method, self.base_url + path, **kwargs)
+
+
+@st.cache_resource
+def get_client(base_url):
+    return ApiClient(base_url)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_json(base_url, path, params=None):
+    """Cached read, returns (data, headers with lower-case names) or raises ApiError."""
+    return get_client(base_url).get_json(path, params)
+
+
+def send(base_url, method, path, **kwargs):
+    """Write through the pooled session and drop the cached reads, which may now be stale."""
+    client = get_client(base_url)
+    response = client.request(method, path, **kwargs)
+    client.forget()
+    fetch_json.clear()
+    return response
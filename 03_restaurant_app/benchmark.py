@@ -0,0 +1,235 @@
+"""
+Happy Restaurant Load Benchmark
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This script load-tests the order CRUD API of the Happy Restaurant backend. It drives a weighted mix of
+POST /orders/, GET /orders/{order_code}, PUT /orders/{order_code} and DELETE /orders/{order_code} requests at a given
+concurrency and reports the throughput and the p50/p95/p99 latency of every endpoint. The results are written to a JSON
+file, and a previous result file can be passed with --compare to see the change between two versions.
+Without --url the backend app is imported and called in-process through an ASGI transport, so no server is needed.
+Every order created by the benchmark uses the "bench-" prefix and is deleted again at the end of the run.
+
+Usage:
+    python benchmark.py --requests 5000 --concurrency 50 --output bench.json
+    python benchmark.py --url http://localhost:8000 --mix post=1,get=8,put=1,delete=1 --compare bench.json
+"""
+
+# Import necessary libraries
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import platform
+import contextlib
+import httpx
+
+# Default weights of the request mix
+DEFAULT_MIX = "post=2,get=6,put=1,delete=1"
+
+ENDPOINTS = {
+    "post": "POST /orders/",
+    "get": "GET /orders/{order_code}",
+    "put": "PUT /orders/{order_code}",
+    "delete": "DELETE /orders/{order_code}",
+}
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().lower()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}' in mix, use {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class Workload:
+    """Shared state of the benchmark workers: live order codes and the recorded latencies."""
+
+    def __init__(self, client, weights, total_requests):
+        self.client = client
+        self.operations = list(weights)
+        self.weights = list(weights.values())
+        self.remaining = total_requests
+        self.run_id = uuid.uuid4().hex[:8]
+        self.counter = 0
+        self.live_codes = []
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self.client_errors = {name: 0 for name in ENDPOINTS}
+
+    def new_order(self):
+        self.counter += 1
+        code = f"bench-{self.run_id}-{self.counter}"
+        return {
+            "order_code": code,
+            "food_name": random.choice(["Pizza", "Burger", "Pasta", "Salad"]),
+            "customer_name": "Bench",
+            "customer_surname": "Mark",
+            "customer_id": f"{code}-customer",
+            "delivery_address": f"{self.counter} Benchmark Street",
+            "payment_method": random.choice(["Cash", "Credit Card", "Online Transfer"]),
+        }
+
+    async def request(self, operation):
+        # Reads, updates and deletes need an existing order, create one first if there is none
+        if operation != "post" and not self.live_codes:
+            operation = "post"
+        if operation == "post":
+            order = self.new_order()
+            call = self.client.post("/orders/", json=order)
+        elif operation == "get":
+            call = self.client.get(f"/orders/{random.choice(self.live_codes)}")
+        elif operation == "put":
+            code = random.choice(self.live_codes)
+            call = self.client.put(f"/orders/{code}", json={"food_name": random.choice(["Pizza", "Sushi"])})
+        else:
+            code = self.live_codes.pop(random.randrange(len(self.live_codes)))
+            call = self.client.delete(f"/orders/{code}")
+
+        start = time.perf_counter()
+        try:
+            response = await call
+        except httpx.HTTPError:
+            self.errors[operation] += 1
+            return
+        self.latencies[operation].append(time.perf_counter() - start)
+        if response.status_code >= 500:
+            self.errors[operation] += 1
+        elif response.status_code >= 400:
+            self.client_errors[operation] += 1
+        elif operation == "post":
+            self.live_codes.append(order["order_code"])
+
+    async def worker(self):
+        while self.remaining > 0:
+            self.remaining -= 1
+            operation = random.choices(self.operations, self.weights)[0]
+            await self.request(operation)
+
+    async def cleanup(self):
+        for code in self.live_codes:
+            await self.client.delete(f"/orders/{code}")
+        self.live_codes = []
+
+
+def summarise(workload, elapsed, args):
+    endpoints = {}
+    for operation, label in ENDPOINTS.items():
+        values = sorted(workload.latencies[operation])
+        if not values and not workload.errors[operation]:
+            continue
+        endpoints[label] = {
+            "requests": len(values) + workload.errors[operation],
+            "server_errors": workload.errors[operation],
+            "client_errors": workload.client_errors[operation],
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else None,
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3) if values else None,
+            "p95_ms": round(percentile(values, 0.95) * 1000, 3) if values else None,
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3) if values else None,
+        }
+    total = sum(len(values) for values in workload.latencies.values())
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": args.url or "in-process",
+        "python": platform.python_version(),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "mix": args.mix,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+def print_report(results, baseline=None):
+    print(f"{results['requests']} requests at concurrency {results['concurrency']} against {results['target']}: "
+          f"{results['throughput_rps']} req/s in {results['duration_s']} s")
+    print(f"{'endpoint':<30}{'count':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for label, stats in results["endpoints"].items():
+        print(f"{label:<30}{stats['requests']:>8}{stats['throughput_rps']:>10}{stats['p50_ms']!s:>10}"
+              f"{stats['p95_ms']!s:>10}{stats['p99_ms']!s:>10}{stats['server_errors']:>8}")
+    if baseline is None:
+        return
+    print(f"\nChange against baseline from {baseline.get('timestamp')}:")
+    for label, stats in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(label)
+        if not before or not before.get("p95_ms") or not stats["p95_ms"]:
+            continue
+        p95_change = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        rps_change = (stats["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] * 100
+        print(f"{label:<30} p95 {p95_change:+.1f}%  throughput {rps_change:+.1f}%")
+
+
+async def run(args):
+    async with contextlib.AsyncExitStack() as stack:
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                       limits=httpx.Limits(max_connections=args.concurrency))
+        else:
+            # Import the backend only when it is benchmarked in-process, and run its startup and shutdown
+            import configparser
+            from restaurant_backend import app, rate_limiter
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            # All requests come from one client here, its per-client rate limits would only measure the 429 answers
+            rate_limiter.configure(configparser.ConfigParser())
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark",
+                                       timeout=args.timeout)
+        await stack.enter_async_context(client)
+        workload = Workload(client, parse_mix(args.mix), args.requests)
+        start = time.perf_counter()
+        await asyncio.gather(*(workload.worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        await workload.cleanup()
+    return summarise(workload, elapsed, args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Happy Restaurant order API.")
+    parser.add_argument("--url", help="Base URL of a running backend, the app is run in-process when omitted")
+    parser.add_argument("--requests", type=int, default=2000, help="Total number of requests to send")
+    parser.add_argument("--concurrency", type=int, default=20, help="Number of concurrent clients")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted request mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, help="Random seed for a repeatable request sequence")
+    parser.add_argument("--output", default="benchmark_results.json", help="File the JSON results are written to")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args(argv)
+    try:
+        parse_mix(args.mix)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Happy Restaurant Order Cache
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module provides a small in-process LRU cache with a time-to-live for the Happy Restaurant backend. The backend
+fills it on reads of GET /orders/{order_code} and removes entries whenever an order is created, updated or deleted, so
+orders that are polled over and over are served without touching the database. Hit, miss, eviction and expiration
+counters are kept for the /cache/stats endpoint.
+The cache lives in one process only; the TTL bounds how long another worker process can serve a stale order.
+
+Usage:
+    cache = LRUCache(max_size=1024, ttl=30)
+    cache.set("A1", rows)
+    rows = cache.get("A1")
+"""
+
+# Import necessary libraries
+import time
+import threading
+from collections import OrderedDict
+
+# Marker returned by get() when the key is not cached, so that falsy values can still be cached
+MISSING = object()
+
+
+class LRUCache:
+    """Least recently used cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_size=1024, ttl=30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
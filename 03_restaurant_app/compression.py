@@ -0,0 +1,232 @@
+"""
+Happy Restaurant Response Compression
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module compresses the responses of the backend for the clients that accept it. CompressionMiddleware encodes
+JSON, HTML and text responses of at least minimum_size bytes with brotli (when the brotli package is installed) or
+gzip, whichever the Accept-Encoding header of the client prefers, and marks every compressible response with
+Vary: Accept-Encoding so shared caches keep the encodings apart. Images and responses that are already encoded are
+passed through unchanged. Streamed responses are compressed chunk by chunk, large bodies are compressed in a worker
+thread so the event loop keeps serving other requests.
+PrecompressedContent holds fixed content, such as the landing page, together with its compressed variants encoded
+once at import time, so serving it costs no compression at all. Its responses carry an ETag and are answered with
+304 Not Modified when the client still has them.
+The settings are read from the [compression] section of config.ini by Compressor.configure(), which the lifespan
+handler calls at startup.
+
+Usage:
+    [compression]
+    enabled = true
+    minimum_size = 500
+    gzip_level = 6
+    brotli_quality = 4
+
+    compressor = Compressor()
+    app.add_middleware(CompressionMiddleware, compressor=compressor)
+    compressor.configure(config)
+
+    LANDING_PAGE = PrecompressedContent(html, "text/html; charset=utf-8")
+    return LANDING_PAGE.response(request, compressor)
+"""
+
+# Import necessary libraries
+import gzip
+import zlib
+import hashlib
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from etags import etag_matches
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Media types worth compressing, images and fonts are compressed already
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "application/xml",
+                      "image/svg+xml", "text/")
+# Bodies larger than this are compressed in a worker thread instead of on the event loop
+THREAD_THRESHOLD = 256 * 1024
+
+
+def accepted_encodings(header):
+    """Return the content codings of an Accept-Encoding header with their q-values."""
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def compressible(headers):
+    media_type = headers.get("content-type", "")
+    # Server-Sent Events must reach the client as they are sent, a compressor would hold them back
+    if media_type.startswith("text/event-stream"):
+        return False
+    return media_type.startswith(COMPRESSIBLE_TYPES) and "content-encoding" not in headers
+
+
+def add_vary(headers):
+    vary = headers.get("vary")
+    if vary is None:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = vary + ", Accept-Encoding"
+
+
+class Compressor:
+    """Compression settings and the choice of encoding for a request."""
+
+    def __init__(self):
+        self.enabled = True
+        self.minimum_size = 500
+        self.gzip_level = 6
+        self.brotli_quality = 4
+
+    @property
+    def encodings(self):
+        """Encodings offered to the clients, in order of preference."""
+        if not self.enabled:
+            return ()
+        return ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def configure(self, config):
+        """Read the [compression] section."""
+        self.enabled = config.getboolean('compression', 'enabled', fallback=True)
+        self.minimum_size = config.getint('compression', 'minimum_size', fallback=500)
+        self.gzip_level = config.getint('compression', 'gzip_level', fallback=6)
+        self.brotli_quality = config.getint('compression', 'brotli_quality', fallback=4)
+
+    def choose(self, accept_encoding, encodings=None):
+        """Return the encoding the client prefers among the offered ones, or None to send the body as it is."""
+        accepted = accepted_encodings(accept_encoding or "")
+        best, best_q = None, 0.0
+        for encoding in encodings if encodings is not None else self.encodings:
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def compress(self, encoding, data):
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def stream(self, encoding):
+        """Return a (compress, flush) pair of functions encoding a body chunk by chunk."""
+        if encoding == "br":
+            encoder = brotli.Compressor(quality=self.brotli_quality)
+            return encoder.process, encoder.finish
+        # wbits 31 writes the gzip header and trailer around the deflate stream
+        encoder = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return encoder.compress, encoder.flush
+
+
+class PrecompressedContent:
+    """Fixed content encoded once in every supported encoding."""
+
+    def __init__(self, content, media_type, cache_control="no-cache"):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.variants = {None: content.encode("utf-8") if isinstance(content, str) else content}
+        identity = self.variants[None]
+        self.variants["gzip"] = gzip.compress(identity, compresslevel=9, mtime=0)
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(identity, quality=11)
+        # Weak, so the ETag stays valid whichever encoding the client received
+        self.etag = 'W/"' + hashlib.sha1(identity).hexdigest() + '"'
+
+    def response(self, request: Request, compressor):
+        headers = {"ETag": self.etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(request, self.etag):
+            return Response(status_code=304, headers=headers)
+        # A variant that came out no smaller than the content itself is never sent
+        encodings = [encoding for encoding in compressor.encodings
+                     if encoding in self.variants and len(self.variants[encoding]) < len(self.variants[None])]
+        encoding = compressor.choose(request.headers.get("accept-encoding"), encodings)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing the responses for the clients that accept it."""
+
+    def __init__(self, app, compressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not self.compressor.enabled:
+            await self.app(scope, receive, send)
+            return
+        encoding = self.compressor.choose(Headers(scope=scope).get("accept-encoding"))
+        start = None
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal start, stream
+            if message["type"] == "http.response.start":
+                # Held back until the first body message tells whether the body is worth compressing
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if start is not None:
+                response_start, start = start, None
+                headers = MutableHeaders(scope=response_start)
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                status = response_start["status"]
+                if not compressible(headers) or status in (204, 206, 304):
+                    await send(response_start)
+                    await send(message)
+                    return
+                add_vary(headers)
+                if encoding is None or (not more_body and len(body) < self.compressor.minimum_size):
+                    await send(response_start)
+                    await send(message)
+                    return
+                headers["Content-Encoding"] = encoding
+                del headers["Content-Length"]
+                if not more_body:
+                    if len(body) > THREAD_THRESHOLD:
+                        body = await run_in_threadpool(self.compressor.compress, encoding, body)
+                    else:
+                        body = self.compressor.compress(encoding, body)
+                    headers["Content-Length"] = str(len(body))
+                    await send(response_start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                stream = self.compressor.stream(encoding)
+                await send(response_start)
+
+            if stream is None:
+                await send(message)
+                return
+            compress, flush = stream
+            body = compress(message.get("body", b""))
+            if message.get("more_body", False):
+                if body:
+                    await send({"type": "http.response.body", "body": body, "more_body": True})
+                return
+            await send({"type": "http.response.body", "body": body + flush()})
+
+        await self.app(scope, receive, send_compressed)
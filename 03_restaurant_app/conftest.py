@@ -0,0 +1,61 @@
+"""
+Happy Restaurant Test Fixtures
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+Fixtures shared by the backend tests. The backend runs in a temporary folder with its own config.ini and database, so
+the tests never touch restaurant.db.
+- app_folder: the temporary folder with a config.ini of the sqlite engine, the test starts the backend itself
+- client: a TestClient of the started backend, once with every storage engine
+
+Usage:
+    def test_something(client):
+        client.post("/orders/", json=new_order("A1"))
+"""
+
+# Import necessary libraries
+import pytest
+from fastapi.testclient import TestClient
+import restaurant_backend
+
+CONFIG = """
+[database]
+name = test_restaurant
+
+[storage]
+engine = {engine}
+snapshot_file =
+
+[cache]
+max_size = 100
+ttl_seconds = 300
+"""
+
+
+def new_order(order_code):
+    return {
+        "order_code": order_code,
+        "food_name": "Pizza",
+        "customer_name": "Test",
+        "customer_surname": "Customer",
+        "customer_id": f"{order_code}-customer",
+        "delivery_address": "1 Test Street",
+        "payment_method": "Cash",
+    }
+
+
+@pytest.fixture
+def app_folder(tmp_path, monkeypatch):
+    (tmp_path / "config.ini").write_text(CONFIG.format(engine="sqlite"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def client(request, tmp_path, monkeypatch):
+    (tmp_path / "config.ini").write_text(CONFIG.format(engine=request.param))
+    monkeypatch.chdir(tmp_path)
+    with TestClient(restaurant_backend.app) as client:
+        yield client
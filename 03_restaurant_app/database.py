@@ -0,0 +1,130 @@
+"""
+Happy Restaurant Database Access Layer
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module provides the shared data-access layer of the Happy Restaurant backend. It keeps a bounded pool of SQLite
+connections that are opened once in WAL mode with tuned pragmas and reused by every request. The blocking SQLite calls
+are executed in a worker thread so the async FastAPI routes never stall the event loop while waiting on the database.
+
+Usage:
+Create a ConnectionPool with the database file and await its helpers from the request handlers, e.g.
+    pool = ConnectionPool("./restaurant.db", size=5)
+    rows = await pool.fetch_all("SELECT * FROM orders WHERE order_code=?", ("A1",))
+"""
+
+# Import necessary libraries
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from starlette.concurrency import run_in_threadpool
+
+# Pragmas applied once to every new connection
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+def fts_match_expression(text):
+    """Turn free text into an FTS5 query that matches rows containing every word as a prefix."""
+    terms = ['"' + word.replace('"', '""') + '"*' for word in text.split()]
+    return " ".join(terms)
+
+
+class ConnectionPool:
+    """Bounded pool of reusable SQLite connections."""
+
+    def __init__(self, database_file, size=5, timeout=5.0, factory=sqlite3.Connection):
+        self.database_file = database_file
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database_file, timeout=self.timeout, check_same_thread=False,
+                               factory=self.factory)
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        logging.debug(f"Opened SQLite connection {self._opened} to {self.database_file}.")
+        return conn
+
+    def acquire(self):
+        # Reuse an idle connection if there is one
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        # Otherwise open a new one as long as the pool is not full
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        # The pool is full, wait for another request to give a connection back
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Timed out waiting for a free database connection")
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, commit on success and roll back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._opened -= 1
+        logging.info("Database connection pool closed.")
+
+    def run(self, func, *args):
+        """Run func(conn, *args) on a pooled connection inside one transaction."""
+        with self.connection() as conn:
+            return func(conn, *args)
+
+    async def run_async(self, func, *args):
+        """Same as run, but executed in a worker thread so the event loop stays free."""
+        return await run_in_threadpool(self.run, func, *args)
+
+    async def execute(self, query, params=()):
+        """Execute a write statement and return the number of affected rows."""
+        return await self.run_async(lambda conn: conn.execute(query, params).rowcount)
+
+    async def fetch_all(self, query, params=()):
+        return await self.run_async(lambda conn: conn.execute(query, params).fetchall())
+
+    async def fetch_one(self, query, params=()):
+        return await self.run_async(lambda conn: conn.execute(query, params).fetchone())
@@ -0,0 +1,181 @@
+"""
+Happy Restaurant Order Events
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module pushes the order changes to the kitchen and dispatch screens, so they do not have to poll the orders.
+Every created, updated and deleted order is recorded by the order store as an event with a sequence number: the SQLite
+store records it with triggers in the same transaction as the write, so the events of every worker share one sequence,
+and the memory store keeps its recent events in memory. EventBus reads the new events after each write of its process
+(and every poll_interval seconds for the writes of the other workers), encodes each event to JSON once and puts it on
+the queue of every subscriber. The backend sends the queues over Server-Sent Events and WebSocket.
+- A subscriber can resume after the last sequence number it received (Last-Event-ID or ?after=). The events it missed
+  are replayed from the store, when they are no longer kept it gets a "reset" event and should reload its orders.
+- Each subscriber has a bounded queue. A subscriber that falls behind by more than queue_size events is dropped, its
+  stream ends and it can reconnect and resume from its last sequence number.
+The store keeps the last `history` events, older ones are pruned every prune_interval seconds.
+
+Usage:
+    bus = EventBus(storage, queue_size=256, history=10000)
+    await bus.start()
+    bus.wake()                                  # after a write
+    async for item in bus.subscribe(after=41, idle_timeout=15):
+        ...                                     # (seq, op, JSON encoded event), or None when idle
+    await bus.close()
+"""
+
+# Import necessary libraries
+import time
+import asyncio
+import logging
+from serialization import dumps
+
+# Most events read from the store in one query
+READ_BATCH = 1000
+
+
+class Subscriber:
+    """Bounded queue of the encoded events for one client."""
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class EventBus:
+    """Fans the order events of the store out to the subscribers of this process."""
+
+    def __init__(self, storage, queue_size=256, history=10000, poll_interval=0.5, prune_interval=60.0):
+        self.storage = storage
+        self.queue_size = queue_size
+        self.history = history
+        self.poll_interval = poll_interval
+        self.prune_interval = prune_interval
+        self.last = 0
+        self.dropped = 0
+        self._subscribers = set()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    async def start(self):
+        self._stopping = False
+        self.last = await self.storage.last_event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            # The loop stops at its next check rather than by cancelling it: a cancel landing while a storage read
+            # runs in the thread pool can be swallowed, and the loop would run on with close() waiting forever
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        # End the open streams
+        for subscriber in self._subscribers:
+            self._drop(subscriber)
+        self._subscribers.clear()
+
+    def wake(self):
+        """Read the new events now instead of at the next poll, called after every write."""
+        self._wake.set()
+
+    @staticmethod
+    def encode(event):
+        seq, op, order_code, row = event
+        return seq, op, dumps({"seq": seq, "op": op, "order_code": order_code, "order": row})
+
+    async def subscribe(self, after=None, idle_timeout=None):
+        """Yield (seq, op, payload) for every event after `after`, or after the latest event when it is None.
+
+        A "reset" event with seq None is yielded first when the events after `after` are no longer kept, and None is
+        yielded after idle_timeout seconds without events so the caller can send a heartbeat.
+        """
+        subscriber = Subscriber(self.queue_size)
+        # Registered before the replay is read, so no event falls between the two; the overlap is skipped below
+        self._subscribers.add(subscriber)
+        try:
+            last = await self.storage.last_event()
+            position = last
+            if after is not None and after != last:
+                replay = await self.storage.events_after(after, READ_BATCH)
+                # The sequence numbers have no holes, so a missing next event means it was pruned
+                if not replay or replay[0][0] != after + 1:
+                    yield None, "reset", dumps({"seq": None, "op": "reset", "last": last})
+                else:
+                    position = after
+                    while replay:
+                        for event in replay:
+                            yield self.encode(event)
+                            position = event[0]
+                        if position >= last:
+                            break
+                        replay = await self.storage.events_after(position, READ_BATCH)
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), idle_timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item is None:
+                    return
+                if item[0] > position:
+                    position = item[0]
+                    yield item
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def _drop(self, subscriber):
+        subscriber.dropped = True
+        # Make room for the end marker, the client resumes from the last event it received
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def _publish(self, events):
+        for event in events:
+            item = self.encode(event)
+            for subscriber in list(self._subscribers):
+                if subscriber.dropped:
+                    continue
+                try:
+                    subscriber.queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    self.dropped += 1
+                    self._subscribers.discard(subscriber)
+                    self._drop(subscriber)
+                    logging.warning(f"Dropped a slow order event subscriber at event {item[0]}.")
+
+    async def _run(self):
+        pruned = time.monotonic()
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopping:
+                break
+            try:
+                if not self._subscribers:
+                    # Nobody listens, new subscribers start from the latest event anyway
+                    self.last = await self.storage.last_event()
+                else:
+                    while True:
+                        events = await self.storage.events_after(self.last, READ_BATCH)
+                        if events:
+                            self.last = events[-1][0]
+                            self._publish(events)
+                        if len(events) < READ_BATCH:
+                            break
+                if time.monotonic() - pruned >= self.prune_interval:
+                    pruned = time.monotonic()
+                    await self.storage.prune_events(self.history)
+            except Exception as e:
+                logging.error(f"Failed to read the order events. Error: {e}")
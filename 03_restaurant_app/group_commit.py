@@ -0,0 +1,104 @@
+"""
+Happy Restaurant Group Commit Writer
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module batches the single-order writes of the backend into shared transactions. Request handlers submit a write
+function to a queue and await its result; one writer task takes everything queued within a short delay (a few
+milliseconds) and runs it on one pooled connection in a single transaction, so a burst of writers takes the SQLite write
+lock and syncs the WAL once per batch instead of once per request. Every write runs inside its own SAVEPOINT, so a
+write that fails (e.g. a duplicate order code) is rolled back alone and its exception is raised to the request that
+submitted it, while the rest of the batch is committed.
+
+Usage:
+    writer = GroupCommitWriter(pool, max_delay=0.005, max_batch=64)
+    writer.start()
+    result = await writer.submit(write_function, *args)   # runs write_function(conn, *args)
+    await writer.close()
+"""
+
+# Import necessary libraries
+import asyncio
+import logging
+
+
+class GroupCommitWriter:
+    """Single writer task committing the submitted writes in batches."""
+
+    def __init__(self, pool, max_delay=0.005, max_batch=64):
+        self.pool = pool
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    @property
+    def depth(self):
+        """Number of writes waiting for the writer task."""
+        return self._queue.qsize()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        """Write what is still queued and stop the writer task."""
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+    async def submit(self, func, *args):
+        """Queue func(conn, *args) for the next batch and return its result or raise its exception."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((func, args, future))
+        return await future
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            # Give the other writers of the burst a moment to join the batch
+            if self.max_delay > 0 and self._queue.empty():
+                await asyncio.sleep(self.max_delay)
+            batch = [first]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch):
+        try:
+            outcomes = await self.pool.run_async(self._write_batch, [(func, args) for func, args, _ in batch])
+        except Exception as e:
+            # The transaction itself failed (e.g. the database stayed locked), every write of the batch failed with it
+            logging.error(f"Group commit of {len(batch)} writes failed. Error: {e}")
+            outcomes = [(False, e)] * len(batch)
+        for (_, _, future), (succeeded, value) in zip(batch, outcomes):
+            if future.cancelled():
+                continue
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    @staticmethod
+    def _write_batch(conn, writes):
+        conn.execute("BEGIN IMMEDIATE")
+        outcomes = []
+        for func, args in writes:
+            conn.execute("SAVEPOINT write")
+            try:
+                outcomes.append((True, func(conn, *args)))
+            except Exception as e:
+                conn.execute("ROLLBACK TO write")
+                outcomes.append((False, e))
+            conn.execute("RELEASE write")
+        logging.debug(f"Group commit of {len(writes)} writes.")
+        return outcomes
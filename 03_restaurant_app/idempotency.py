@@ -0,0 +1,283 @@
+"""
+Happy Restaurant Idempotency Keys
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module lets clients retry an order creation safely. A client sends an Idempotency-Key header with
+POST /orders/; IdempotencyMiddleware stores the response of the first request under that key, and answers every retry
+with the same key and the same body with the stored response, before FastAPI parses the body and without writing
+anything, so a storm of retries after a slow period costs no database writes. The replayed response carries an
+Idempotent-Replayed: true header.
+- The stored responses live in a small LRU in memory and in the idempotency_keys table of the SQLite database, so they
+  survive a restart and are found by every worker. They expire after ttl seconds.
+- Before the first request runs, its key is reserved in the database with a pending row, so it runs once across all
+  the workers. Retries that arrive while it is still running wait for its response in the same worker, and get 409
+  with a Retry-After header in the other workers. A pending row whose request never finished (its worker died) is
+  taken over after PENDING_TIMEOUT seconds, and a completed row is never replaced.
+- A key reused with a different body is answered with 422, a key longer than MAX_KEY_LENGTH with 400.
+- Keys are kept apart per X-API-Key, so two partners cannot see each other's responses.
+- Responses with a 5xx status are not stored and the reservation is dropped, so the retry runs the request again.
+The routes, the time to live and the size of the in-memory LRU are read from the [idempotency] section of config.ini.
+
+Usage:
+    [idempotency]
+    routes = POST /orders/
+    ttl = 86400
+    max_entries = 10000
+
+    store = IdempotencyStore()
+    app.add_middleware(IdempotencyMiddleware, store=store)
+    IdempotencyStore.create_table(conn)
+    store.configure(config, pool)
+"""
+
+# Import necessary libraries
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+MAX_KEY_LENGTH = 255
+# Seconds between two deletions of the expired keys from the database
+PRUNE_INTERVAL = 60.0
+# Seconds a key stays reserved by a request that has not finished, and the Retry-After of the requests refused meanwhile
+PENDING_TIMEOUT = 60.0
+RETRY_AFTER = 1
+# Status of a reserved key whose request is still running
+PENDING = 0
+
+TABLE = """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        media_type TEXT,
+        body BLOB NOT NULL,
+        expires REAL NOT NULL
+    )
+"""
+
+
+class StoredResponse:
+    """Response of the first request made with a key."""
+
+    __slots__ = ("fingerprint", "status", "media_type", "body", "expires")
+
+    def __init__(self, fingerprint, status, media_type, body, expires):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.media_type = media_type
+        self.body = body
+        self.expires = expires
+
+
+class IdempotencyStore:
+    """Stored responses by key, in an LRU with a time to live backed by the SQLite database."""
+
+    def __init__(self):
+        self.routes = set()
+        self.ttl = 86400.0
+        self.max_entries = 10000
+        self.pool = None
+        self.replays = 0
+        # Futures of the requests running in this worker by key, done when their response is stored
+        self.in_flight = {}
+        self._entries = OrderedDict()
+        self._pruned = time.monotonic()
+
+    @staticmethod
+    def create_table(conn):
+        conn.execute(TABLE)
+
+    def configure(self, config, pool):
+        """Read the [idempotency] section, pool persists the responses (None keeps them in memory only)."""
+        self.routes = set()
+        for route in config.get('idempotency', 'routes', fallback='POST /orders/').split(","):
+            method, _, path = route.strip().partition(" ")
+            if path:
+                self.routes.add((method.upper(), path.strip()))
+        self.ttl = config.getfloat('idempotency', 'ttl', fallback=86400.0)
+        self.max_entries = config.getint('idempotency', 'max_entries', fallback=10000)
+        self.pool = pool
+        self._entries.clear()
+
+    def _remember(self, key, stored):
+        self._entries[key] = stored
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key):
+        """Return the stored response of key kept in memory, or None."""
+        stored = self._entries.get(key)
+        if stored is not None and stored.expires < time.time():
+            self._entries.pop(key, None)
+            return None
+        if stored is not None:
+            self._entries.move_to_end(key)
+        return stored
+
+    async def reserve(self, key, fingerprint):
+        """Reserve key for a request about to run and return None, or return the row that holds it already.
+
+        The row is the response stored by another worker or before a restart, or a PENDING one whose request is still
+        running elsewhere.
+        """
+        if self.pool is None:
+            return None
+        stored = await self.pool.run_async(self._reserve, key, fingerprint)
+        if stored is not None and stored.status != PENDING:
+            self._remember(key, stored)
+        return stored
+
+    def _reserve(self, conn, key, fingerprint):
+        query = "SELECT fingerprint, status, media_type, body, expires FROM idempotency_keys WHERE key=?"
+        row = conn.execute(query, (key,)).fetchone()
+        if row is not None and row[1] != PENDING and row[4] >= time.time():
+            return StoredResponse(row[0], row[1], row[2], bytes(row[3]), row[4])
+        # Read again under the write lock, so two workers never both reserve the key
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(query, (key,)).fetchone()
+        if row is not None and row[4] >= time.time():
+            return StoredResponse(row[0], row[1], row[2], bytes(row[3]), row[4])
+        # No row, or an expired response or reservation that can be taken over
+        conn.execute("INSERT OR REPLACE INTO idempotency_keys VALUES (?, ?, ?, NULL, X'', ?)",
+                     (key, fingerprint, PENDING, time.time() + PENDING_TIMEOUT))
+        return None
+
+    async def put(self, key, stored):
+        self._remember(key, stored)
+        if self.pool is None:
+            return
+        try:
+            await self.pool.run_async(self._save, key, stored, time.monotonic() - self._pruned >= PRUNE_INTERVAL)
+        except Exception as e:
+            # The response was sent already, a retry on this worker still finds it in memory
+            logging.error(f"Failed to store the response of an idempotency key. Error: {e}")
+
+    async def release(self, key, fingerprint):
+        """Drop the reservation of a request that failed, so its retry runs again."""
+        if self.pool is None:
+            return
+        try:
+            await self.pool.execute("DELETE FROM idempotency_keys WHERE key=? AND status=? AND fingerprint=?",
+                                    (key, PENDING, fingerprint))
+        except Exception as e:
+            # The reservation expires after PENDING_TIMEOUT
+            logging.error(f"Failed to release an idempotency key. Error: {e}")
+
+    def _save(self, conn, key, stored, prune):
+        # Only the reservation of this request is completed, a stored response is never replaced
+        conn.execute("""
+            UPDATE idempotency_keys SET status=?, media_type=?, body=?, expires=?
+            WHERE key=? AND status=? AND fingerprint=?
+        """, (stored.status, stored.media_type, stored.body, stored.expires, key, PENDING, stored.fingerprint))
+        if prune:
+            self._pruned = time.monotonic()
+            conn.execute("DELETE FROM idempotency_keys WHERE expires < ?", (time.time(),))
+
+
+def replay(stored):
+    headers = {"Idempotent-Replayed": "true"}
+    return Response(content=stored.body, status_code=stored.status, media_type=stored.media_type, headers=headers)
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware answering the retries of a request with the stored response of the first one."""
+
+    def __init__(self, app, store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.store.routes:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": f"Idempotency-Key must have 1 to {MAX_KEY_LENGTH} characters"},
+                                    status_code=400)
+            await response(scope, receive, send)
+            return
+
+        # The body is read here to fingerprint it and handed to the app unchanged
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(scope["method"].encode() + scope["path"].encode() + b"\0" + body).hexdigest()
+        key = f"{headers.get('x-api-key', '')}:{scope['method']} {scope['path']}:{idempotency_key}"
+
+        # A retry that arrives while the first request runs waits for its response. The key is taken before the
+        # stored response is looked up, so two requests never both miss it and run
+        while key in self.store.in_flight:
+            await asyncio.shield(self.store.in_flight[key])
+        done = asyncio.get_running_loop().create_future()
+        self.store.in_flight[key] = done
+        try:
+            stored = await self.store.get(key)
+            if stored is None:
+                stored = await self.store.reserve(key, fingerprint)
+            if stored is None:
+                await self._run(scope, receive, send, body, key, fingerprint)
+                return
+            if stored.fingerprint != fingerprint:
+                response = JSONResponse({"detail": "Idempotency-Key was already used with a different request"},
+                                        status_code=422)
+            elif stored.status == PENDING:
+                response = JSONResponse({"detail": "A request with this Idempotency-Key is still running"},
+                                        status_code=409, headers={"Retry-After": str(RETRY_AFTER)})
+            else:
+                self.store.replays += 1
+                response = replay(stored)
+            await response(scope, receive, send)
+        finally:
+            del self.store.in_flight[key]
+            done.set_result(None)
+
+    async def _run(self, scope, receive, send, body, key, fingerprint):
+        sent_body = False
+        status = None
+        media_type = None
+        response_body = []
+
+        async def receive_body():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_and_capture(message):
+            nonlocal status, media_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                media_type = Headers(raw=message["headers"]).get("content-type")
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_capture)
+        except BaseException:
+            await asyncio.shield(self.store.release(key, fingerprint))
+            raise
+        if status is not None and status < 500:
+            await self.store.put(key, StoredResponse(fingerprint, status, media_type, b"".join(response_body),
+                                                     time.time() + self.store.ttl))
+        else:
+            await self.store.release(key, fingerprint)
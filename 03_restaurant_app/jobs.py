@@ -0,0 +1,230 @@
+"""
+Happy Restaurant Background Jobs
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module runs the slow work that follows a write (kitchen tickets, receipts, analytics rollups) after the response
+was sent. A request handler enqueues a job, a row of the jobs table of the SQLite database, and returns; a pool of
+worker tasks in every backend process claims the due jobs and runs the handler registered for their kind, at most
+`workers` at a time per process.
+- Jobs are durable: they survive a restart and are shared by the workers of every process.
+- A claimed job is hidden from the other workers for visibility_timeout seconds. A handler that runs longer is
+  cancelled, and the job of a worker that died is claimed again once its visibility timeout expired.
+- A job that fails is retried after an exponential backoff (backoff, 2 * backoff, ... up to max_backoff, with
+  jitter) and marked failed after max_attempts attempts; failed jobs stay in the table with their last error.
+- Finished jobs are deleted.
+- close() lets the running jobs finish for up to shutdown_timeout seconds, then cancels them; a cancelled job is
+  claimed again once its visibility timeout expired.
+Jobs can be queued with enqueue(), or inserted into the jobs table by the write they follow (e.g. by a trigger), in the
+same transaction, so they are never lost between the write and the queueing; wake() then has the workers of this
+process look for them right away.
+A handler is an async function taking the JSON payload of the job; it may run more than once for the same job (after
+a crash or a visibility timeout), so it should be safe to repeat. The settings are read from the [jobs] section of
+config.ini.
+
+Usage:
+    [jobs]
+    workers = 2
+    visibility_timeout = 30
+
+    job_queue = JobQueue()
+
+    @job_queue.handler("kitchen_ticket")
+    async def print_kitchen_ticket(order):
+        ...
+
+    JobQueue.create_table(conn)
+    job_queue.configure(config, pool)
+    await job_queue.start()
+    await job_queue.enqueue("kitchen_ticket", order)
+    job_queue.wake()                            # after a write that queued jobs itself
+    await job_queue.close()
+"""
+
+# Import necessary libraries
+import json
+import time
+import random
+import asyncio
+import logging
+
+TABLE = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        run_at REAL NOT NULL,
+        last_error TEXT
+    )
+"""
+# Only the queued jobs are looked up by the workers, the failed ones are kept out of the index
+INDEX = "CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs (run_at) WHERE status = 'queued'"
+
+# Read first, so the idle workers do not take the write lock at every poll
+DUE = "SELECT 1 FROM jobs WHERE status = 'queued' AND run_at <= ? LIMIT 1"
+# A queued job is due once run_at has passed; claiming it moves run_at to the end of its visibility timeout
+CLAIM = """
+    UPDATE jobs SET attempts = attempts + 1, run_at = ?
+    WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND run_at <= ? ORDER BY run_at LIMIT 1)
+    RETURNING id, kind, payload, attempts, max_attempts
+"""
+# Jobs whose last attempt was claimed by a worker that never finished it
+EXPIRE = """
+    UPDATE jobs SET status = 'failed', last_error = 'visibility timeout expired on the last attempt'
+    WHERE status = 'queued' AND run_at <= ? AND attempts >= max_attempts
+"""
+
+
+class JobQueue:
+    """Durable queue of jobs in the SQLite database, and the worker tasks of this process running them."""
+
+    def __init__(self):
+        self.handlers = {}
+        self.pool = None
+        self.workers = 2
+        self.poll_interval = 1.0
+        self.visibility_timeout = 30.0
+        self.max_attempts = 5
+        self.backoff = 1.0
+        self.max_backoff = 300.0
+        self.shutdown_timeout = 5.0
+        self.completed = 0
+        self.retried = 0
+        self._tasks = []
+        self._wake = None
+        self._stopping = False
+
+    @staticmethod
+    def create_table(conn):
+        conn.execute(TABLE)
+        conn.execute(INDEX)
+
+    def handler(self, kind):
+        """Decorator registering an async function as the handler of the jobs of one kind."""
+        def register(func):
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def configure(self, config, pool):
+        self.pool = pool
+        self.workers = config.getint('jobs', 'workers', fallback=2)
+        self.poll_interval = config.getfloat('jobs', 'poll_interval', fallback=1.0)
+        self.visibility_timeout = config.getfloat('jobs', 'visibility_timeout', fallback=30.0)
+        self.max_attempts = config.getint('jobs', 'max_attempts', fallback=5)
+        self.backoff = config.getfloat('jobs', 'backoff', fallback=1.0)
+        self.max_backoff = config.getfloat('jobs', 'max_backoff', fallback=300.0)
+        self.shutdown_timeout = config.getfloat('jobs', 'shutdown_timeout', fallback=5.0)
+
+    async def start(self):
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self.completed = 0
+        self.retried = 0
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._run()) for _ in range(self.workers)]
+
+    async def close(self):
+        """Stop the workers once their current job is done, cancel the ones still busy after shutdown_timeout."""
+        if not self._tasks:
+            return
+        # The workers stop at their next check rather than by cancelling them: a cancel landing while a query runs in
+        # the thread pool can be swallowed, and the worker would run on with close() waiting forever
+        self._stopping = True
+        self._wake.set()
+        _, busy = await asyncio.wait(self._tasks, timeout=self.shutdown_timeout)
+        if busy:
+            logging.warning(f"Cancelled {len(busy)} background jobs still running at shutdown.")
+            for task in busy:
+                task.cancel()
+            await asyncio.wait(busy, timeout=self.shutdown_timeout)
+        self._tasks = []
+
+    def wake(self):
+        """Look for due jobs now instead of at the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def enqueue(self, kind, payload, delay=0.0):
+        await self.enqueue_many(kind, [payload], delay)
+
+    async def enqueue_many(self, kind, payloads, delay=0.0):
+        """Queue one job of the given kind per payload, due in delay seconds."""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler is registered for the jobs of kind '{kind}'")
+        run_at = time.time() + delay
+        rows = [(kind, json.dumps(payload), self.max_attempts, run_at) for payload in payloads]
+        if not rows:
+            return
+        await self.pool.run_async(
+            lambda conn: conn.executemany(
+                "INSERT INTO jobs (kind, payload, max_attempts, run_at) VALUES (?, ?, ?, ?)", rows))
+        self.wake()
+
+    async def stats(self):
+        """Jobs queued and failed in the database, and the jobs completed and retried by this process."""
+        counts = dict(await self.pool.fetch_all("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return {"queued": counts.get("queued", 0), "failed": counts.get("failed", 0), "completed": self.completed,
+                "retried": self.retried, "workers": len(self._tasks)}
+
+    def retry_delay(self, attempts):
+        """Seconds before the next attempt after `attempts` failed ones, with jitter so retries do not bunch up."""
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _claim(self, conn):
+        now = time.time()
+        if conn.execute(DUE, (now,)).fetchone() is None:
+            return None
+        conn.execute(EXPIRE, (now,))
+        return conn.execute(CLAIM, (now + self.visibility_timeout, now)).fetchone()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                job = await self.pool.run_async(self._claim)
+            except Exception as e:
+                logging.error(f"Failed to claim a background job. Error: {e}")
+                job = None
+            if job is None:
+                # Nothing is due, wait for a job enqueued by this process or poll for the others
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            await self._process(*job)
+
+    async def _process(self, job_id, kind, payload, attempts, max_attempts):
+        try:
+            handler = self.handlers.get(kind)
+            if handler is None:
+                raise LookupError(f"No handler is registered for the jobs of kind '{kind}'")
+            await asyncio.wait_for(handler(json.loads(payload)), self.visibility_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if attempts >= max_attempts:
+                logging.error(f"Background job {job_id} ({kind}) failed after {attempts} attempts. Error: {error}")
+                query, params = "UPDATE jobs SET status = 'failed', last_error = ? WHERE id = ?", (error, job_id)
+            else:
+                self.retried += 1
+                delay = self.retry_delay(attempts)
+                logging.warning(f"Background job {job_id} ({kind}) failed, retrying in {delay:.1f} s. Error: {error}")
+                query, params = "UPDATE jobs SET run_at = ?, last_error = ? WHERE id = ?", (time.time() + delay,
+                                                                                            error, job_id)
+        else:
+            self.completed += 1
+            query, params = "DELETE FROM jobs WHERE id = ?", (job_id,)
+        try:
+            await self.pool.execute(query, params)
+        except Exception as e:
+            # The job becomes visible again when its timeout expires and runs once more
+            logging.error(f"Failed to record the outcome of background job {job_id}. Error: {e}")
@@ -9,77 +9,457 @@ This script is used to create a FastAPI backend application for the Happy Restau
 name from the config.ini file and creates a SQLite database with the specified name. The script provides the following
 endpoints to manage orders:
 - POST /orders/: Create a new order
+- POST /orders/bulk/: Create many orders at once from a JSON list
+- POST /orders/bulk/ndjson: Create many orders at once from a newline-delimited JSON stream
 - GET /orders/{order_code}: Get an order by order code
+- POST /orders/batch/: Get many orders by their order codes in one request
+- GET /search/orders?q=...: Full-text search over customer name, surname, delivery address and food name
 - PUT /orders/{order_code}: Update an order by order code
 - DELETE /orders/{order_code}: Delete an order by order code
-The script also provides a default background image at the root URL.
+- GET /stats/orders: Get the number of orders per food name and per payment method
+- GET /events/orders: Live feed of the created, updated and deleted orders as Server-Sent Events
+- WebSocket /events/orders: The same live feed over a WebSocket
+- GET /cache/stats: Get the hit, miss and eviction counters of the order cache
+- GET /jobs/stats: Get the number of queued and failed background jobs
+- GET /metrics: Get the request and SQL timing metrics in the Prometheus text format
+The script also provides a default background image at the root URL. The supporting modules are:
+- storage.py: order stores behind the order endpoints, SQLite (default) or in memory with snapshot persistence
+- database.py: pooled SQLite connections used for all database access
+- cache.py: LRU cache serving single order reads
+- static_assets.py: in-memory images with ETag and range support
+- logging_setup.py: background queue writing the log records as JSON lines
+- metrics.py: request and SQL timings exposed at /metrics
+- serialization.py: orjson encoded responses for the order reads
+- etags.py: change versions behind the ETags of the order reads, so unchanged orders are answered with 304
+- group_commit.py: optional single writer committing the single-order writes in small batches
+- rate_limit.py: per-client rate limits (429) and load shedding of the writes (503), configured in config.ini
+- compression.py: gzip or brotli compression of the JSON and HTML responses, and the precompressed landing page
+- events.py: bus fanning the order events out to the subscribers of the live feed
+- idempotency.py: Idempotency-Key support, retries of POST /orders/ get the stored response of the first request
+- startup_profile.py: timing of the startup phases, and a cold start report when run as a script
+- migrate.py: versioned schema migrations tracked with PRAGMA user_version
+- jobs.py: durable queue of the background jobs run after the order writes (kitchen tickets), with retries
 
 Usage:
 Run the script to start the FastAPI application.
 """
 
 # Import necessary libraries
-import io
 import os
 import sys
+import json
 import sqlite3
-import uvicorn
 import logging
 import configparser
+from typing import List
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
-from fastapi.responses import HTMLResponse, StreamingResponse
-
-# Check if the folder exists
-if not os.path.exists("logs"):
-    # Create the folder
-    os.makedirs("logs")
-else:
-    pass
-
-# Configure logging
-logging.basicConfig(filename='./logs/backend.log', level=logging.DEBUG,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
-
-# Create a ConfigParser object
-config = configparser.ConfigParser()
-try:
-    # Read the configuration file
-    config.read('config.ini')
-    # Access values from the path section of the config file
-    db_name = config.get('database', 'name')
-    logging.info(f"Database name: {db_name} is read from the config file.")
-except Exception as e:
-    logging.error(f"Failed to read the configuration from the config file. Error: {e}")
-    raise sys.exit(1)
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from database import ConnectionPool
+from cache import LRUCache, MISSING
+from static_assets import StaticAssets
+from logging_setup import setup_logging, stop_logging, ACCESS_LOGGER
+from metrics import REGISTRY, MetricsMiddleware, InstrumentedConnection
+from serialization import JSONBytesResponse, rows_to_json
+from etags import ChangeVersions, etag_matches, not_modified
+from group_commit import GroupCommitWriter
+from rate_limit import RateLimiter, RateLimitMiddleware
+from compression import Compressor, CompressionMiddleware, PrecompressedContent
+from events import EventBus
+from idempotency import IdempotencyStore, IdempotencyMiddleware
+from startup_profile import StartupTimer
+from migrate import migrate, column_indexed
+import jobs
+from jobs import JobQueue
+from storage import SQLiteOrderStorage, MemoryOrderStorage, DuplicateOrderError, STATS_DIMENSIONS
+
+# Logger of the per-request lines, its records are sampled
+access_log = logging.getLogger(ACCESS_LOGGER)
+
+# Number of orders written per transaction by the bulk endpoints, kept below SQLite's bound parameter limit
+BULK_CHUNK_SIZE = 500
+# Largest number of order codes accepted by one batch lookup
+MAX_BATCH_CODES = 5000
+# Largest page of search results
+MAX_SEARCH_RESULTS = 100
+# File the kitchen_ticket jobs append a line per new order to
+KITCHEN_TICKETS_FILE = "./logs/kitchen_tickets.log"
+
+# Set up by the lifespan handler of every worker process:
+# - pool: pooled SQLite connections used for all database access
+# - storage: store of the orders selected in the [storage] section of config.ini
+# - order_cache: read-through cache of single orders keyed by order code
+# - versions: change version of the orders table behind the ETags, shared by the workers through the database
+# - static_assets: images read from disk once and then served from memory
+# - writer: group commit writer of the single-order writes, None unless enabled in config.ini
+# - events: bus of the live order feed
+DATABASE_FILE = None
+pool = None
+storage = None
+writer = None
+order_cache = None
+versions = None
+static_assets = None
+events = None
+# Durations of the startup phases of this process, logged once the lifespan handler is ready
+startup_timer = None
+# Seconds without events after which the live feed sends a heartbeat
+EVENTS_HEARTBEAT = 15.0
+
+# Rate limits, write backpressure and response compression, configured by the lifespan handler
+rate_limiter = RateLimiter()
+compressor = Compressor()
+# Stored responses of the requests sent with an Idempotency-Key, configured by the lifespan handler
+idempotency_store = IdempotencyStore()
+# Background jobs run after the order writes, configured and started by the lifespan handler
+job_queue = JobQueue()
+# Kinds of the jobs queued for every created order, read from the [jobs] section of config.ini
+ORDER_JOBS = ()
+
+# Landing page showing the background image, built and compressed once
+LANDING_PAGE = PrecompressedContent("""
+    <!DOCTYPE html>
+    <html>
+    <head>
+    <style>
+    body, html {
+        height: 100%;
+        margin: 0;
+        overflow: hidden;
+    }
 
-# Create FastAPI app
-app = FastAPI()
-
-# SQLite database setup
-DATABASE_FILE = f"./{db_name}.db"
-
-# Create table if it doesn't exist
-def create_table():
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS orders (
-            order_code TEXT PRIMARY KEY,
-            food_name TEXT NOT NULL,
-            customer_name TEXT NOT NULL,
-            customer_surname TEXT NOT NULL,
-            customer_id TEXT NOT NULL UNIQUE,
-            delivery_address TEXT NOT NULL,
-            payment_method TEXT NOT NULL
-        )
+    .fullscreen-img {
+        width: 100%;
+        height: 100%;
+        object-fit: cover;
+    }
+    </style>
+    </head>
+    <body>
+    <img class="fullscreen-img" src="/image" />
+    </body>
+    </html>
+    """, "text/html; charset=utf-8")
+
+# Schema of the orders table and of its full-text index, every statement is idempotent.
+# orders_fts is keyed by the implicit rowid of orders, so rebuild it after a VACUUM:
+# INSERT INTO orders_fts(orders_fts) VALUES ('rebuild')
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS orders (
+        order_code TEXT PRIMARY KEY,
+        food_name TEXT NOT NULL,
+        customer_name TEXT NOT NULL,
+        customer_surname TEXT NOT NULL,
+        customer_id TEXT NOT NULL UNIQUE,
+        delivery_address TEXT NOT NULL,
+        payment_method TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS orders_fts USING fts5(
+        customer_name, customer_surname, delivery_address, food_name,
+        content='orders', content_rowid='rowid'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS orders_fts_insert AFTER INSERT ON orders BEGIN
+        INSERT INTO orders_fts(rowid, customer_name, customer_surname, delivery_address, food_name)
+        VALUES (new.rowid, new.customer_name, new.customer_surname, new.delivery_address, new.food_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS orders_fts_delete AFTER DELETE ON orders BEGIN
+        INSERT INTO orders_fts(orders_fts, rowid, customer_name, customer_surname, delivery_address, food_name)
+        VALUES ('delete', old.rowid, old.customer_name, old.customer_surname, old.delivery_address, old.food_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS orders_fts_update AFTER UPDATE ON orders BEGIN
+        INSERT INTO orders_fts(orders_fts, rowid, customer_name, customer_surname, delivery_address, food_name)
+        VALUES ('delete', old.rowid, old.customer_name, old.customer_surname, old.delivery_address, old.food_name);
+        INSERT INTO orders_fts(rowid, customer_name, customer_surname, delivery_address, food_name)
+        VALUES (new.rowid, new.customer_name, new.customer_surname, new.delivery_address, new.food_name);
+    END
+    """,
+    # Number of orders per value of every column in STATS_DIMENSIONS, kept up to date by the triggers below
+    """
+    CREATE TABLE IF NOT EXISTS order_stats (
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (dimension, value)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_stats_insert AFTER INSERT ON orders BEGIN
+        INSERT INTO order_stats VALUES ('food_name', new.food_name, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+        INSERT INTO order_stats VALUES ('payment_method', new.payment_method, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_stats_delete AFTER DELETE ON orders BEGIN
+        UPDATE order_stats SET count = count - 1 WHERE dimension = 'food_name' AND value = old.food_name;
+        UPDATE order_stats SET count = count - 1 WHERE dimension = 'payment_method' AND value = old.payment_method;
+        DELETE FROM order_stats WHERE count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_stats_update AFTER UPDATE OF food_name, payment_method ON orders BEGIN
+        UPDATE order_stats SET count = count - 1 WHERE dimension = 'food_name' AND value = old.food_name;
+        UPDATE order_stats SET count = count - 1 WHERE dimension = 'payment_method' AND value = old.payment_method;
+        INSERT INTO order_stats VALUES ('food_name', new.food_name, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+        INSERT INTO order_stats VALUES ('payment_method', new.payment_method, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+        DELETE FROM order_stats WHERE count <= 0;
+    END
+    """,
+    # Events of the live order feed, recorded in the transaction of the write so all workers share one sequence
+    """
+    CREATE TABLE IF NOT EXISTS order_events (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        order_code TEXT NOT NULL,
+        data TEXT
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_events_insert AFTER INSERT ON orders BEGIN
+        INSERT INTO order_events (op, order_code, data) VALUES ('created', new.order_code, json_array(
+            new.order_code, new.food_name, new.customer_name, new.customer_surname, new.customer_id,
+            new.delivery_address, new.payment_method));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_events_update AFTER UPDATE ON orders BEGIN
+        INSERT INTO order_events (op, order_code, data) VALUES ('updated', new.order_code, json_array(
+            new.order_code, new.food_name, new.customer_name, new.customer_surname, new.customer_id,
+            new.delivery_address, new.payment_method));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_events_delete AFTER DELETE ON orders BEGIN
+        INSERT INTO order_events (op, order_code) VALUES ('deleted', old.order_code);
+    END
+    """,
+)
+
+
+# Schema version 1, everything the backend created before it had migrations. Every statement is idempotent, so a
+# database created by an older backend is brought to version 1 as it is
+def create_orders_schema(conn):
+    fts_exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='orders_fts'").fetchone()
+    stats_exist = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='order_stats'").fetchone()
+    for statement in SCHEMA:
+        conn.execute(statement)
+    ChangeVersions.create_table(conn)
+    IdempotencyStore.create_table(conn)
+    # Index the orders that were stored before the search table existed
+    if not fts_exists:
+        conn.execute("INSERT INTO orders_fts(orders_fts) VALUES ('rebuild')")
+    # Count the orders that were stored before the summary table existed, from then on the triggers keep it current
+    if not stats_exist:
+        for dimension in STATS_DIMENSIONS:
+            conn.execute(f"""
+                INSERT INTO order_stats (dimension, value, count)
+                SELECT ?, {dimension}, COUNT(*) FROM orders GROUP BY {dimension}
+            """, (dimension,))
+
+
+def index_idempotency_expiry(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys (expires)")
+
+
+def index_customer_id(conn):
+    # The UNIQUE constraint of customer_id comes with an index, but orders tables created by the first versions of the
+    # backend have neither
+    if column_indexed(conn, "orders", "customer_id"):
+        return
+    try:
+        conn.execute("CREATE UNIQUE INDEX idx_orders_customer_id ON orders (customer_id)")
+    except sqlite3.IntegrityError:
+        logging.warning("Some customer IDs are used by several orders, their index cannot be unique.")
+        conn.execute("CREATE INDEX idx_orders_customer_id ON orders (customer_id)")
+
+
+# Jobs of the created orders are queued by a trigger, in the transaction of the insert, so an order committed without
+# its jobs cannot happen. The trigger queues one job per row of order_job_kinds, filled from config.ini at startup
+def queue_jobs_on_order_insert(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS order_job_kinds (
+            kind TEXT PRIMARY KEY,
+            max_attempts INTEGER NOT NULL
+        ) WITHOUT ROWID
     """)
-    conn.commit()
-    conn.close()
-    logging.info("Database table 'orders' created successfully.")
+    order = ", ".join(f"'{column}', new.{column}" for column in ORDER_COLUMNS)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_queue_jobs AFTER INSERT ON orders BEGIN
+            INSERT INTO jobs (kind, payload, max_attempts, run_at)
+            SELECT kind, json_object({order}), max_attempts, (julianday('now') - 2440587.5) * 86400.0
+            FROM order_job_kinds;
+        END
+    """)
+
+
+def set_order_jobs(conn, kinds, max_attempts):
+    # Every worker runs this with the same config, the table is only written when it changed
+    wanted = sorted((kind, max_attempts) for kind in kinds)
+    if conn.execute("SELECT kind, max_attempts FROM order_job_kinds ORDER BY kind").fetchall() != wanted:
+        conn.execute("DELETE FROM order_job_kinds")
+        conn.executemany("INSERT INTO order_job_kinds VALUES (?, ?)", wanted)
+
+
+# Schema migrations in order, PRAGMA user_version of the database counts the ones applied. Append new ones at the end
+# and never change one that was released
+MIGRATIONS = [
+    ("orders, search index, statistics, change versions, events and idempotency keys", create_orders_schema),
+    ("index on the expiry of the idempotency keys", index_idempotency_expiry),
+    ("index on the customer ID of the orders", index_customer_id),
+    ("background jobs", JobQueue.create_table),
+    ("background jobs queued by the order inserts", queue_jobs_on_order_insert),
+]
+
+# Lookups of the order stores that have to go through an index, checked whenever the schema changes
+CHECKED_QUERIES = (
+    ("order by code", "SELECT * FROM orders WHERE order_code=?", ("A1",)),
+    ("orders by code", "SELECT * FROM orders WHERE order_code IN (?, ?)", ("A1", "A2")),
+    ("customer IDs taken", "SELECT customer_id FROM orders WHERE customer_id IN (?, ?)", ("C1", "C2")),
+    ("order update", "UPDATE orders SET food_name=? WHERE order_code=?", ("Pizza", "A1")),
+    ("order delete", "DELETE FROM orders WHERE order_code=?", ("A1",)),
+    ("order search", """
+        SELECT o.order_code FROM orders_fts JOIN orders o ON o.rowid = orders_fts.rowid
+        WHERE orders_fts MATCH ? ORDER BY orders_fts.rank LIMIT ? OFFSET ?
+    """, ('"pizza"*', 10, 0)),
+    ("order events", "SELECT seq, op, order_code, data FROM order_events WHERE seq > ? ORDER BY seq LIMIT ?", (0, 10)),
+    ("order events pruning", "DELETE FROM order_events WHERE seq <= (SELECT max(seq) FROM order_events) - ?", (10,)),
+    ("idempotency key", "SELECT status, body FROM idempotency_keys WHERE key=?", ("k",)),
+    ("idempotency keys pruning", "DELETE FROM idempotency_keys WHERE expires < ?", (0,)),
+    ("background job claim", jobs.CLAIM, (0, 0)),
+    ("background jobs expiry", jobs.EXPIRE, (0,)),
+    ("background jobs due", jobs.DUE, (0,)),
+)
+
+
+# Create or migrate the schema. Every worker runs this at startup, an up to date database is not locked at all
+def create_table(conn):
+    migrate(conn, MIGRATIONS, CHECKED_QUERIES)
+    logging.info(f"Database schema is at version {len(MIGRATIONS)}.")
+
+
+# Startup and shutdown of every worker process. Nothing is read or created at import time, so the workers started by
+# serve.py each set themselves up here and the schema is applied under the SQLite write lock.
+@asynccontextmanager
+async def lifespan(app):
+    global DATABASE_FILE, pool, storage, order_cache, versions, static_assets, writer, events, EVENTS_HEARTBEAT
+    global startup_timer, ORDER_JOBS
+    startup_timer = StartupTimer()
+    # Create the logs folder, several workers may do this at the same time
+    os.makedirs("logs", exist_ok=True)
+
+    # Create a ConfigParser object and read the configuration file
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    # Configure logging, records are written as JSON lines by a background thread
+    log_listener = setup_logging('./logs/backend.log',
+                                 level=config.get('logging', 'level', fallback='INFO'),
+                                 access_sample_rate=config.getfloat('logging', 'access_sample_rate', fallback=1.0))
+    startup_timer.mark("logging")
+
+    try:
+        # Access values from the path section of the config file
+        db_name = config.get('database', 'name')
+        pool_size = config.getint('database', 'pool_size', fallback=5)
+        busy_timeout = config.getfloat('database', 'busy_timeout', fallback=5.0)
+        cache_size = config.getint('cache', 'max_size', fallback=1024)
+        cache_ttl = config.getfloat('cache', 'ttl_seconds', fallback=30.0)
+        static_max_age = config.getint('static', 'max_age', fallback=604800)
+        group_commit = config.getboolean('database', 'group_commit', fallback=False)
+        group_commit_delay = config.getfloat('database', 'group_commit_delay', fallback=0.005)
+        group_commit_max_batch = config.getint('database', 'group_commit_max_batch', fallback=64)
+        storage_engine = config.get('storage', 'engine', fallback='sqlite')
+        snapshot_file = config.get('storage', 'snapshot_file', fallback='') or None
+        log_file = config.get('storage', 'log_file', fallback='./orders.log')
+        snapshot_interval = config.getfloat('storage', 'snapshot_interval', fallback=60.0)
+        events_queue_size = config.getint('events', 'queue_size', fallback=256)
+        events_history = config.getint('events', 'history', fallback=10000)
+        events_poll_interval = config.getfloat('events', 'poll_interval', fallback=0.5)
+        EVENTS_HEARTBEAT = config.getfloat('events', 'heartbeat', fallback=15.0)
+        ORDER_JOBS = tuple(kind.strip() for kind in config.get('jobs', 'order_jobs', fallback='').split(",")
+                           if kind.strip())
+        for kind in ORDER_JOBS:
+            if kind not in job_queue.handlers:
+                raise ValueError(f"Unknown background job '{kind}', use one of {', '.join(job_queue.handlers)}")
+        if storage_engine not in ("sqlite", "memory"):
+            raise ValueError(f"Unknown storage engine '{storage_engine}', use sqlite or memory")
+        logging.info(f"Database name: {db_name} is read from the config file.")
+    except Exception as e:
+        logging.error(f"Failed to read the configuration from the config file. Error: {e}")
+        raise sys.exit(1)
+    startup_timer.mark("config")
+
+    # SQLite database setup
+    DATABASE_FILE = f"./{db_name}.db"
+    pool = ConnectionPool(DATABASE_FILE, size=pool_size, timeout=busy_timeout, factory=InstrumentedConnection)
+    await pool.run_async(create_table)
+    startup_timer.mark("schema")
+    order_cache = LRUCache(max_size=cache_size, ttl=cache_ttl)
+    static_assets = StaticAssets(max_age=static_max_age)
+    if storage_engine == "memory":
+        # The orders live in this process only, so the change versions do not need to follow other workers
+        versions = ChangeVersions()
+        # The lock file keeps a second worker from opening the store, each one would keep orders of its own
+        storage = MemoryOrderStorage(snapshot_file, log_file, snapshot_interval=snapshot_interval,
+                                     lock_file=f"./{db_name}.memory.lock")
+    else:
+        versions = ChangeVersions(DATABASE_FILE)
+        if group_commit:
+            writer = GroupCommitWriter(pool, max_delay=group_commit_delay, max_batch=group_commit_max_batch)
+            writer.start()
+            logging.info(f"Group commit enabled with a delay of {group_commit_delay * 1000:g} ms.")
+        storage = SQLiteOrderStorage(pool, versions, writer=writer)
+    try:
+        await storage.start()
+    except RuntimeError as e:
+        logging.error(f"Failed to open the {storage_engine} order store. Error: {e}")
+        raise
+    logging.info(f"Orders are stored with the {storage_engine} engine.")
+    startup_timer.mark("storage")
+    events = EventBus(storage, queue_size=events_queue_size, history=events_history,
+                      poll_interval=events_poll_interval)
+    await events.start()
+    rate_limiter.configure(config, queue_depth=lambda: writer.depth if writer is not None else 0)
+    compressor.configure(config)
+    idempotency_store.configure(config, pool)
+    job_queue.configure(config, pool)
+    # The orders of the memory store are not in the database, queue_order_jobs() queues their jobs instead
+    await pool.run_async(set_order_jobs, ORDER_JOBS if storage_engine == "sqlite" else (), job_queue.max_attempts)
+    await job_queue.start()
+    startup_timer.mark("events, jobs and middleware")
+    startup_timer.log()
+    yield
+    await job_queue.close()
+    await events.close()
+    await storage.close()
+    if writer is not None:
+        await writer.close()
+        writer = None
+    versions.close()
+    pool.close()
+    stop_logging(log_listener)
+
 
-create_table()
+# Create FastAPI app
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+app.add_middleware(CompressionMiddleware, compressor=compressor)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+app.add_middleware(MetricsMiddleware)
 
 # Pydantic model for request body
 class OrderCreate(BaseModel):
@@ -92,6 +472,13 @@ class OrderCreate(BaseModel):
     payment_method: str
 
 
+ORDER_COLUMNS = list(OrderCreate.model_fields)
+
+
+class OrderBatchRequest(BaseModel):
+    order_codes: List[str]
+
+
 class OrderUpdate(BaseModel):
     food_name: str = None
     customer_name: str = None
@@ -100,141 +487,321 @@ class OrderUpdate(BaseModel):
     payment_method: str = None
 
 
-# Function to execute SQL query and fetch all rows
-def fetch_all(query):
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+# Function to pick up the order writes of the other workers before a read. Writes of this process invalidate their own
+# orders, only a write by another worker clears the whole cache.
+async def refresh_orders():
+    if "orders" in await versions.refresh_async():
+        order_cache.clear()
 
 
-@app.get("/")
-async def show_fullscreen_image():
-    html_content = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-    <style>
-    body, html {
-        height: 100%;
-        margin: 0;
-        overflow: hidden;
-    }
+# Function to drop the cached copies of written orders once the write is committed
+def orders_changed(version, *order_codes):
+    for order_code in order_codes:
+        order_cache.invalidate(order_code)
+    if version is not None:
+        versions.committed("orders", version)
+        # Push the new order events to the live feed now rather than at its next poll
+        events.wake()
 
-    .fullscreen-img {
-        width: 100%;
-        height: 100%;
-        object-fit: cover;
-    }
-    </style>
-    </head>
-    <body>
-    <img class="fullscreen-img" src="/image" />
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html_content, status_code=200)
+
+# Start the background jobs of the created orders. The SQLite store queued them with the orders, the workers of this
+# process are woken up to run them now. The memory store keeps no orders in the database, its jobs are queued here,
+# after the write, and a failure is only logged
+async def queue_order_jobs(orders):
+    if not ORDER_JOBS or not orders:
+        return
+    if not isinstance(storage, MemoryOrderStorage):
+        job_queue.wake()
+        return
+    for kind in ORDER_JOBS:
+        try:
+            await job_queue.enqueue_many(kind, [order.dict() for order in orders])
+        except Exception as e:
+            logging.error(f"Failed to queue the {kind} jobs of {len(orders)} orders. Error: {e}")
+
+
+@job_queue.handler("kitchen_ticket")
+async def print_kitchen_ticket(order):
+    # One line per order for the kitchen printer, written out of the event loop
+    line = f"{order['order_code']}\t{order['food_name']}\t{order['customer_name']} {order['customer_surname']}\n"
+
+    def append_ticket():
+        with open(KITCHEN_TICKETS_FILE, "a", encoding="utf-8") as tickets:
+            tickets.write(line)
+
+    await run_in_threadpool(append_ticket)
+
+
+async def insert_orders_in_chunks(orders):
+    results = []
+    for start in range(0, len(orders), BULK_CHUNK_SIZE):
+        chunk = orders[start:start + BULK_CHUNK_SIZE]
+        statuses, version = await storage.create_many([tuple(order.dict().values()) for order in chunk])
+        created = [order for order, status in zip(chunk, statuses) if status == "created"]
+        orders_changed(version, *(order.order_code for order in created))
+        await queue_order_jobs(created)
+        results.extend({"order_code": order.order_code, "status": status} for order, status in zip(chunk, statuses))
+    return results
+
+
+def bulk_summary(results):
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "rejected": len(results) - created, "results": results}
+
+
+@app.get("/")
+async def show_fullscreen_image(request: Request):
+    return LANDING_PAGE.response(request, compressor)
 
 @app.get("/image")
-async def get_image():
-    with open("./images/get.jpg", "rb") as f:
-        image_data = f.read()
-    return StreamingResponse(io.BytesIO(image_data), media_type="image/jpeg")
+async def get_image(request: Request):
+    return static_assets.response("./images/get.jpg", request)
 
 
 @app.get("/favicon.ico")
-async def get_favicon():
-    logging.info("GET request received at favicon.ico URL.")
+async def get_favicon(request: Request):
+    access_log.info("GET request received at favicon.ico URL.")
     # Return a default favicon.ico file
-    return FileResponse("./images/icon.ico")
+    return static_assets.response("./images/icon.ico", request)
 
 @app.post("/orders/")
 async def create_order(order: OrderCreate):
-    logging.info("POST request received at /orders/ endpoint.")
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    access_log.info("POST request received at /orders/ endpoint.")
     try:
-        cursor.execute("""
-            INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            order.order_code,
-            order.food_name,
-            order.customer_name,
-            order.customer_surname,
-            order.customer_id,
-            order.delivery_address,
-            order.payment_method
-        ))
-        conn.commit()
+        version = await storage.create(tuple(order.dict().values()))
+        orders_changed(version, order.order_code)
         logging.info("Order created successfully.")
-    except sqlite3.IntegrityError:
-        conn.close()
+    except DuplicateOrderError:
         logging.error("Failed to create order. Order code or customer ID already exists.")
         raise HTTPException(status_code=400, detail="Order code or customer ID already exists")
-    conn.close()
+    await queue_order_jobs([order])
     return order.dict()
 
 
+@app.post("/orders/bulk/")
+async def create_orders_bulk(orders: List[OrderCreate]):
+    access_log.info(f"POST request received at /orders/bulk/ endpoint with {len(orders)} orders.")
+    results = await insert_orders_in_chunks(orders)
+    summary = bulk_summary(results)
+    logging.info(f"Bulk insert finished: {summary['created']} created, {summary['rejected']} rejected.")
+    return summary
+
+
+@app.post("/orders/bulk/ndjson")
+async def create_orders_ndjson(request: Request):
+    access_log.info("POST request received at /orders/bulk/ndjson endpoint.")
+    # Every non-empty line gets its result in input order, the status of a valid line is filled in once it is written
+    results = []
+    chunk = []
+    buffer = b""
+
+    def parse_line(line_number, line):
+        if not line.strip():
+            return
+        try:
+            order = OrderCreate(**json.loads(line))
+        except (ValueError, TypeError) as e:
+            results.append({"line": line_number, "status": "invalid", "detail": str(e)})
+            return
+        result = {"line": line_number, "order_code": order.order_code}
+        results.append(result)
+        chunk.append((result, order))
+
+    async def write_chunk():
+        written = await insert_orders_in_chunks([order for _, order in chunk])
+        for (result, _), row in zip(chunk, written):
+            result["status"] = row["status"]
+        chunk.clear()
+
+    # Parse the body as it arrives and write every full chunk straight away
+    line_number = 0
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            parse_line(line_number, line)
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            await write_chunk()
+    parse_line(line_number + 1, buffer)
+    if chunk:
+        await write_chunk()
+    summary = bulk_summary(results)
+    logging.info(f"NDJSON bulk insert finished: {summary['created']} created, {summary['rejected']} rejected.")
+    return summary
+
+
 @app.get("/orders/{order_code}")
-async def read_order(order_code: str):
-    logging.info(f"GET request received at /orders/{order_code} endpoint.")
-    rows = fetch_all(f"SELECT * FROM orders WHERE order_code='{order_code}'")
+async def read_order(order_code: str, request: Request):
+    access_log.info(f"GET request received at /orders/{order_code} endpoint.")
+    await refresh_orders()
+    # The ETag is taken before the read, so a concurrent write can only make it older than the data
+    etag = versions.etag("orders", order_code)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    rows = order_cache.get(order_code)
+    if rows is MISSING:
+        version = versions.version("orders")
+        row = await storage.get(order_code)
+        rows = [row] if row is not None else []
+        # A write committed during the read may already have invalidated the order, its old rows must not be cached
+        if rows and versions.version("orders") == version:
+            order_cache.set(order_code, rows)
     if not rows:
         logging.error(f"Order with order code {order_code} not found.")
         raise HTTPException(status_code=404, detail="Order not found")
-    return rows
+    return JSONBytesResponse(rows, headers={"ETag": etag})
+
+
+@app.post("/orders/batch/")
+async def read_orders_batch(batch: OrderBatchRequest):
+    access_log.info(f"POST request received at /orders/batch/ endpoint with {len(batch.order_codes)} order codes.")
+    order_codes = list(dict.fromkeys(batch.order_codes))
+    if len(order_codes) > MAX_BATCH_CODES:
+        logging.error(f"Batch lookup with {len(order_codes)} order codes rejected.")
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_CODES} order codes per request")
+    # Serve what is cached and read the rest from the store
+    await refresh_orders()
+    found = {}
+    uncached = []
+    for order_code in order_codes:
+        rows = order_cache.get(order_code)
+        if rows is MISSING:
+            uncached.append(order_code)
+        else:
+            found[order_code] = rows[0]
+    if uncached:
+        version = versions.version("orders")
+        rows = await storage.get_many(uncached)
+        cacheable = versions.version("orders") == version
+        for row in rows:
+            found[row[0]] = row
+            if cacheable:
+                order_cache.set(row[0], [row])
+    return JSONBytesResponse({
+        "orders": [found[order_code] for order_code in order_codes if order_code in found],
+        "missing": [order_code for order_code in order_codes if order_code not in found],
+    })
 
 
 @app.put("/orders/{order_code}")
 async def update_order(order_code: str, order_update: OrderUpdate):
-    logging.info(f"PUT request received at /orders/{order_code} endpoint.")
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    update_fields = []
+    access_log.info(f"PUT request received at /orders/{order_code} endpoint.")
+    update_fields = {}
     for key, value in order_update.dict().items():
         if value is not None:
-            update_fields.append((key, value))
+            update_fields[key] = value
     if not update_fields:
-        conn.close()
         logging.error("No fields to update.")
         raise HTTPException(status_code=400, detail="No fields to update")
     try:
-        cursor.execute(f"""
-            UPDATE orders
-            SET {', '.join([f"{field[0]}=?" for field in update_fields])}
-            WHERE order_code=?
-        """, tuple([field[1] for field in update_fields] + [order_code]))
-        conn.commit()
+        _, version = await storage.update(order_code, update_fields)
+        orders_changed(version, order_code)
         logging.info("Order updated successfully.")
-    except sqlite3.IntegrityError:
-        conn.close()
+    except DuplicateOrderError:
         logging.error("Failed to update order. Customer ID already exists.")
         raise HTTPException(status_code=400, detail="Customer ID already exists")
-    conn.close()
     return dict(order_code=order_code, **order_update.dict())
 
 
 @app.delete("/orders/{order_code}")
 async def delete_order(order_code: str):
-    logging.info(f"DELETE request received at /orders/{order_code} endpoint.")
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM orders WHERE order_code=?", (order_code,))
-    if cursor.rowcount == 0:
-        conn.close()
+    access_log.info(f"DELETE request received at /orders/{order_code} endpoint.")
+    deleted, version = await storage.delete(order_code)
+    orders_changed(version, order_code)
+    if not deleted:
         logging.error(f"Order with order code {order_code} not found.")
         raise HTTPException(status_code=404, detail="Order not found")
-    conn.commit()
-    conn.close()
     logging.info("Order deleted successfully.")
     return {"message": "Order deleted successfully"}
 
 
+@app.get("/search/orders")
+async def search_orders(q: str,
+                        limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+                        offset: int = Query(0, ge=0)):
+    access_log.info(f"GET request received at /search/orders endpoint with query '{q}'.")
+    if not q.split():
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    rows = await storage.search(q, limit, offset)
+    return JSONBytesResponse(rows_to_json(rows, ORDER_COLUMNS))
+
+
+@app.get("/stats/orders")
+async def get_order_stats(request: Request):
+    access_log.info("GET request received at /stats/orders endpoint.")
+    # The summary changes with every order write, so it shares the ETag version of the orders table
+    await refresh_orders()
+    etag = versions.etag("orders", "stats")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    rows = await storage.stats()
+    stats = {dimension: {} for dimension in STATS_DIMENSIONS}
+    for dimension, value, count in rows:
+        stats[dimension][value] = count
+    return JSONBytesResponse(stats, headers={"ETag": etag})
+
+
+# Sequence number to resume the live feed from, EventSource sends the last one it received as Last-Event-ID
+def resume_after(request, after):
+    if after is not None:
+        return after
+    last_event_id = request.headers.get("last-event-id")
+    return int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+
+async def server_sent_events(after):
+    async for item in events.subscribe(after, idle_timeout=EVENTS_HEARTBEAT):
+        if item is None:
+            yield b": heartbeat\n\n"
+            continue
+        seq, op, payload = item
+        event_id = f"id: {seq}\n" if seq is not None else ""
+        yield f"{event_id}event: {op}\ndata: ".encode() + payload + b"\n\n"
+
+
+@app.get("/events/orders")
+async def stream_order_events(request: Request, after: int = Query(None, ge=0)):
+    access_log.info("GET request received at /events/orders endpoint.")
+    return StreamingResponse(server_sent_events(resume_after(request, after)), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/events/orders")
+async def order_events_socket(websocket: WebSocket, after: int = Query(None, ge=0)):
+    await websocket.accept()
+    try:
+        async for item in events.subscribe(after, idle_timeout=EVENTS_HEARTBEAT):
+            if item is None:
+                await websocket.send_text('{"op":"heartbeat"}')
+            else:
+                await websocket.send_text(item[2].decode())
+        # The feed ended because this client fell behind or the server stops, the client reconnects with ?after=
+        await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return order_cache.stats()
+
+
+@app.get("/jobs/stats")
+async def get_job_stats():
+    return await job_queue.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 # Run the FastAPI app
 if __name__ == "__main__":
     logging.info("Starting the FastAPI server...")
+    # Only needed to run this file directly, the servers of serve.py import it themselves
+    import uvicorn
     # TODO change the ip to server ip in production
     uvicorn.run(app, host="localhost", port=8000)
 
@@ -11,6 +11,9 @@ functionalities to manage orders:
 - View Order: View an order by order code
 - Update Order: Update an order by order code
 - Delete Order: Delete an order by order code
+- Order Statistics: Number of orders per food and per payment method
+
+All calls to the backend go through api_client.py, which reuses connections and caches the reads between reruns.
 
 Usage:
 Run the script to start the Streamlit application.
@@ -23,6 +26,7 @@ import logging
 import requests
 import configparser
 import streamlit as st
+from api_client import ApiError, fetch_json, send
 
 # Check if the folder exists
 if not os.path.exists("logs"):
@@ -55,7 +59,7 @@ def main():
     font_color = "white"
     st.title("Happy Restaurant 🍔")
 
-    menu = ["Insert Order", "View Order", "Update Order", "Delete Order"]
+    menu = ["Insert Order", "View Order", "Update Order", "Delete Order", "Order Statistics"]
     choice = st.sidebar.selectbox("Select the Section", menu)
     st.sidebar.write("Welcome to the Happy Restaurant")
     st.sidebar.image("./images/pizza.jpg", use_column_width=True)
@@ -96,7 +100,7 @@ def main():
                 "delivery_address": delivery_address,
                 "payment_method": payment_method,
             }
-            response = requests.post(f"{base_url}/orders/", json=payload)
+            response = send(base_url, "POST", "/orders/", json=payload)
             if response.status_code == 200:
                 st.success("Order inserted successfully!")
                 logging.info("Order inserted successfully")
@@ -109,12 +113,11 @@ def main():
         logging.info("User accessed View Order section")
         order_code = st.text_input("Order Code")
         if st.button("View"):
-            response = requests.get(f"{base_url}/orders/{order_code}")
-            if response.status_code == 200:
-                order = response.json()
+            try:
+                order, _ = fetch_json(base_url, f"/orders/{order_code}")
                 st.write(order)
                 logging.info(f"Viewed order with code {order_code}")
-            else:
+            except (ApiError, requests.RequestException):
                 st.error("Order not found.")
                 logging.error(f"Order with code {order_code} not found")
 
@@ -145,9 +148,7 @@ def main():
 
             if payload:
                 logging.info("Payload for update: " + str(payload))
-                response = requests.put(
-                    f"{base_url}/orders/{order_code}", json=payload
-                )
+                response = send(base_url, "PUT", f"/orders/{order_code}", json=payload)
                 if response.status_code == 200:
                     st.success("Order updated successfully!")
                     logging.info("Order updated successfully")
@@ -164,7 +165,7 @@ def main():
         order_code = st.text_input("Order Code")
         if st.button("Delete"):
             logging.info("User requested to delete an order")
-            response = requests.delete(f"{base_url}/orders/{order_code}")
+            response = send(base_url, "DELETE", f"/orders/{order_code}")
             if response.status_code == 200:
                 st.success("Order deleted successfully!")
                 logging.info("Order deleted successfully")
@@ -172,6 +173,22 @@ def main():
                 st.error("Failed to delete order.")
                 logging.error("Failed to delete order")
 
+    elif choice == "Order Statistics":
+        st.subheader("Order Statistics")
+        logging.info("User accessed Order Statistics section")
+        try:
+            stats, _ = fetch_json(base_url, "/stats/orders")
+        except (ApiError, requests.RequestException):
+            st.error("Failed to fetch order statistics.")
+            logging.error("Failed to fetch order statistics")
+        else:
+            for dimension, title in (("food_name", "Orders per Food"), ("payment_method", "Orders per Payment Method")):
+                st.markdown(f"**{title}**")
+                if stats[dimension]:
+                    st.bar_chart({"orders": stats[dimension]})
+                else:
+                    st.write("No orders yet.")
+
 
 if __name__ == "__main__":
     main()
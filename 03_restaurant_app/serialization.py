@@ -0,0 +1,47 @@
+"""
+Happy Restaurant Response Serialization
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module provides the fast JSON response path of the backend. Rows read from SQLite are encoded to JSON bytes in one
+step with orjson and sent as they are, so FastAPI does not run them through jsonable_encoder and the response model
+again. When orjson is not installed the standard json module is used instead.
+
+Usage:
+    return JSONBytesResponse(rows)
+    return JSONBytesResponse(rows_to_json(rows, ["name", "surname"]))
+"""
+
+# Import necessary libraries
+import json
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content):
+    """Encode content to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def rows_to_json(rows, columns):
+    """Encode database rows as a JSON array of objects keyed by the column names."""
+    return dumps([dict(zip(columns, row)) for row in rows])
+
+
+class JSONBytesResponse(Response):
+    """JSON response whose content is either already encoded bytes or a plain structure to encode."""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,83 @@
+"""
+Happy Restaurant Production Server
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This script is the production entry point of the Happy Restaurant backend. It runs the FastAPI app in several worker
+processes so that all CPU cores are used, either with uvicorn's own process manager or with gunicorn and uvicorn workers
+when gunicorn is installed. Each worker creates the schema in its lifespan handler under the SQLite write lock, so
+starting many workers at once is safe. The memory storage engine keeps the orders of one process, it is refused
+with more than one worker. The ETag versions are kept in the database, so every worker sees the writes of
+the others, also when the app is started with "uvicorn --workers" or gunicorn directly instead of this script.
+On shutdown the open requests get graceful_timeout seconds to finish, after which the live order feeds still connected
+are closed and their clients reconnect to another worker.
+The defaults are read from the [server] section of config.ini and can be overridden on the command line.
+
+Usage:
+    python serve.py --workers 4
+    python serve.py --server gunicorn --host 0.0.0.0 --port 8000
+"""
+
+# Import necessary libraries
+import os
+import sys
+import argparse
+import configparser
+import uvicorn
+
+APP = "restaurant_backend:app"
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class GunicornServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("loglevel", args.log_level)
+            self.cfg.set("graceful_timeout", args.graceful_timeout)
+
+        def load(self):
+            from restaurant_backend import app
+            return app
+
+    GunicornServer().run()
+
+
+def main(argv=None):
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    parser = argparse.ArgumentParser(description="Run the Happy Restaurant backend with several workers.")
+    parser.add_argument("--host", default=config.get('server', 'host', fallback='127.0.0.1'))
+    parser.add_argument("--port", type=int, default=config.getint('server', 'port', fallback=8000))
+    parser.add_argument("--workers", type=int, default=config.getint('server', 'workers', fallback=os.cpu_count() or 1))
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"],
+                        default=config.get('server', 'server', fallback='uvicorn'))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--graceful-timeout", type=int,
+                        default=config.getint('server', 'graceful_timeout', fallback=10))
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    # Every worker would keep orders of its own in the memory engine, and they would share its snapshot and log files
+    if config.get('storage', 'engine', fallback='sqlite') == "memory" and args.workers > 1:
+        parser.error("the memory storage engine keeps the orders of one process, use --workers 1 or engine = sqlite")
+
+    if args.server == "gunicorn":
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            parser.error("gunicorn is not installed, use --server uvicorn")
+        run_gunicorn(args)
+    else:
+        uvicorn.run(APP, host=args.host, port=args.port, workers=args.workers, log_level=args.log_level,
+                    timeout_graceful_shutdown=args.graceful_timeout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Happy Restaurant Startup Profile
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module measures how long a worker of the backend takes from a cold start until it serves requests, which decides
+how fast new containers come up when the backend is scaled out. StartupTimer times the phases of the lifespan handler
+(reading the config, opening the database, loading the orders, ...); the backend logs them at every startup. Run as a
+script, this module starts the backend in a fresh interpreter, the way a new worker starts, and prints:
+- the slowest top-level imports, measured with python -X importtime
+- the time of the interpreter and the imports, and of every startup phase of the lifespan handler
+- the total cold start compared with cold_start_target_ms of the [server] section of config.ini
+It exits with status 1 when the target is missed, so it can run as a check before a release.
+
+Usage:
+    python startup_profile.py
+    python startup_profile.py --target-ms 1500 --top 10
+"""
+
+# Import necessary libraries
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import subprocess
+import configparser
+
+APP_MODULE = "restaurant_backend"
+
+
+class StartupTimer:
+    """Durations of the consecutive phases of a startup."""
+
+    def __init__(self):
+        self.phases = []
+        self._last = time.perf_counter()
+
+    def mark(self, name):
+        """End the phase called name, the next phase starts now."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+
+    def log(self):
+        phases = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.phases)
+        logging.info(f"Startup took {self.total * 1000:.1f} ms: {phases}.")
+
+
+def import_times(module):
+    """Return (name, cumulative seconds) of the modules imported directly by module, slowest first."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # A module is listed after its own imports, each level of nesting is indented by two more spaces
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            times.append((name.strip(), int(cumulative) / 1e6))
+        elif depth == 0:
+            if name.strip() == module:
+                return sorted(times, key=lambda item: -item[1])
+            times = []
+    return []
+
+
+def measure_startup():
+    """Import the app and run its lifespan startup, print the timings as JSON (runs in the fresh interpreter)."""
+    start = time.perf_counter()
+    module = __import__(APP_MODULE)
+    imported = time.perf_counter()
+
+    async def start_and_stop():
+        async with module.app.router.lifespan_context(module.app):
+            return time.perf_counter()
+
+    started = asyncio.run(start_and_stop())
+    print(json.dumps({"import": imported - start, "startup": started - imported,
+                      "phases": module.startup_timer.phases}))
+
+
+def main(argv=None):
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    parser = argparse.ArgumentParser(description=f"Measure the cold start of {APP_MODULE}.")
+    parser.add_argument("--target-ms", type=float,
+                        default=config.getfloat('server', 'cold_start_target_ms', fallback=2000.0))
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports shown")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        measure_startup()
+        return 0
+
+    launched = time.perf_counter()
+    result = subprocess.run([sys.executable, __file__, "--child"], capture_output=True, text=True)
+    cold_start = time.perf_counter() - launched
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return result.returncode
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    print(f"Slowest imports of {APP_MODULE}:")
+    for name, seconds in import_times(APP_MODULE)[:args.top]:
+        print(f"  {seconds * 1000:9.1f} ms  {name}")
+    print("Cold start:")
+    interpreter = cold_start - timings["import"] - timings["startup"]
+    print(f"  {interpreter * 1000:9.1f} ms  interpreter start, shutdown and exit")
+    print(f"  {timings['import'] * 1000:9.1f} ms  import {APP_MODULE}")
+    for name, seconds in timings["phases"]:
+        print(f"  {seconds * 1000:9.1f} ms  startup: {name}")
+    verdict = "within" if cold_start * 1000 <= args.target_ms else "over"
+    print(f"  {cold_start * 1000:9.1f} ms  total, {verdict} the target of {args.target_ms:g} ms")
+    return 0 if verdict == "within" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Happy Restaurant Static Assets
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module serves the static images of the Happy Restaurant backend from memory. Every file is read from disk once,
+the first time it is requested, together with a strong ETag and its Last-Modified date. Responses carry a long
+Cache-Control header, conditional requests (If-None-Match / If-Modified-Since) are answered with 304 Not Modified and
+single byte ranges (Range: bytes=start-end) are answered with 206 Partial Content.
+
+Usage:
+    assets = StaticAssets(max_age=604800)
+    return assets.response("./images/get.jpg", request)
+"""
+
+# Import necessary libraries
+import os
+import hashlib
+import logging
+import mimetypes
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request, Response
+from etags import etag_matches
+
+
+class StaticAsset:
+    """One file loaded into memory with its validators."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.path = path
+        self.mtime = int(os.stat(path).st_mtime)
+        self.etag = '"' + hashlib.sha1(self.data).hexdigest() + '"'
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+class StaticAssets:
+    """In-memory store of static files that builds cache-friendly responses."""
+
+    def __init__(self, max_age=604800):
+        self.max_age = max_age
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        asset = self._assets.get(path)
+        if asset is None:
+            with self._lock:
+                asset = self._assets.get(path)
+                if asset is None:
+                    asset = StaticAsset(path)
+                    self._assets[path] = asset
+                    logging.info(f"Static asset {path} loaded into memory ({len(asset.data)} bytes).")
+        return asset
+
+    def response(self, path, request: Request):
+        asset = self.get(path)
+        headers = {
+            "ETag": asset.etag,
+            "Last-Modified": asset.last_modified,
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Accept-Ranges": "bytes",
+        }
+        if self._not_modified(asset, request):
+            return Response(status_code=304, headers=headers)
+
+        byte_range = self._byte_range(asset, request)
+        if byte_range is None:
+            return Response(content=asset.data, media_type=asset.media_type, headers=headers)
+        if byte_range == "unsatisfiable":
+            headers["Content-Range"] = f"bytes */{len(asset.data)}"
+            return Response(status_code=416, headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(asset.data)}"
+        return Response(content=asset.data[start:end + 1], status_code=206, media_type=asset.media_type,
+                        headers=headers)
+
+    @staticmethod
+    def _not_modified(asset, request):
+        if "if-none-match" in request.headers:
+            return etag_matches(request, asset.etag)
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                return asset.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def _byte_range(asset, request):
+        """Return (start, end) for a satisfiable single range, "unsatisfiable", or None to send the whole file."""
+        header = request.headers.get("range")
+        if not header or not header.startswith("bytes=") or "," in header:
+            return None
+        # A range tied to an old version of the file is ignored and the full file is sent
+        if_range = request.headers.get("if-range")
+        if if_range is not None and if_range not in (asset.etag, asset.last_modified):
+            return None
+        size = len(asset.data)
+        first, _, last = header[len("bytes="):].strip().partition("-")
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+            else:
+                start = max(size - int(last), 0)
+                end = size - 1
+        except ValueError:
+            return None
+        if start > end or start >= size:
+            return "unsatisfiable"
+        return start, min(end, size - 1)
@@ -0,0 +1,496 @@
+"""
+Happy Restaurant Order Storage
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+This module holds the order stores behind the order endpoints of the backend. Both implement the OrderStorage
+interface (create, get, update, delete and their batch variants, plus search and statistics) on order rows, which are
+tuples in the ORDER_COLUMNS order:
+- SQLiteOrderStorage keeps the orders in the SQLite database through the connection pool, optionally batching the
+  single-order writes with the group commit writer. It is the default and the only store shared by several workers.
+- MemoryOrderStorage keeps the orders in dictionaries indexed by order code and customer ID and serves every call
+  without touching the disk. Each write is appended to a log file, and a snapshot of all orders is written every few
+  seconds, after which the log starts over. On startup the snapshot is loaded and the log replayed on top of it. The
+  orders live in one process, so this store is meant for a single worker and for tests: it holds an exclusive lock on
+  its lock file while it is open, and a second process opening it fails at startup. Its search is a plain prefix match
+  returning the orders in the order they were created, not ranked like the FTS5 search of the SQLite store.
+Every write returns the new change version of the orders, which the backend records with ChangeVersions.committed().
+Both stores also keep the recent order events (created, updated, deleted) with gapless sequence numbers, read by the
+EventBus of events.py: the SQLite store fills the order_events table with triggers, the memory store keeps a deque.
+
+Usage:
+    storage = SQLiteOrderStorage(pool, versions, writer=None)
+    storage = MemoryOrderStorage("./orders.snapshot.json", "./orders.log", snapshot_interval=60,
+                                 lock_file="./restaurant.memory.lock")
+    await storage.start()
+    version = await storage.create(row)
+    row = await storage.get("A1")
+    await storage.close()
+"""
+
+# Import necessary libraries
+import os
+import json
+import sqlite3
+import asyncio
+import logging
+from collections import Counter, deque
+from starlette.concurrency import run_in_threadpool
+from database import fts_match_expression
+
+ORDER_COLUMNS = ("order_code", "food_name", "customer_name", "customer_surname", "customer_id", "delivery_address",
+                 "payment_method")
+# Columns counted by stats() and searched by search()
+STATS_DIMENSIONS = ("food_name", "payment_method")
+SEARCH_COLUMNS = ("customer_name", "customer_surname", "delivery_address", "food_name")
+
+CODE = ORDER_COLUMNS.index("order_code")
+CUSTOMER_ID = ORDER_COLUMNS.index("customer_id")
+
+
+class DuplicateOrderError(ValueError):
+    """Raised when a write would reuse an existing order code or customer ID."""
+
+
+class OrderStorage:
+    """Interface of the order stores."""
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def create(self, row):
+        """Store a new order and return the new version, raise DuplicateOrderError if it is taken."""
+        raise NotImplementedError
+
+    async def create_many(self, rows):
+        """Store the rows that are free and return ([status per row], new version or None)."""
+        raise NotImplementedError
+
+    async def get(self, order_code):
+        """Return the row of the order or None."""
+        raise NotImplementedError
+
+    async def get_many(self, order_codes):
+        """Return the rows of the orders that exist, in no particular order."""
+        raise NotImplementedError
+
+    async def update(self, order_code, fields):
+        """Change the given columns of an order and return (found, new version or None)."""
+        raise NotImplementedError
+
+    async def delete(self, order_code):
+        """Delete an order and return (found, new version or None)."""
+        raise NotImplementedError
+
+    async def search(self, text, limit, offset):
+        """Return the rows whose search columns contain every word of text as a prefix.
+
+        The SQLite store returns the best matches first (FTS5 rank), the memory store in the order of creation.
+        """
+        raise NotImplementedError
+
+    async def stats(self):
+        """Return (dimension, value, count) tuples for every column of STATS_DIMENSIONS."""
+        raise NotImplementedError
+
+    async def last_event(self):
+        """Return the sequence number of the latest order event, 0 before the first one."""
+        raise NotImplementedError
+
+    async def events_after(self, seq, limit):
+        """Return up to limit (seq, op, order_code, row or None) events following seq, oldest first."""
+        raise NotImplementedError
+
+    async def prune_events(self, keep):
+        """Forget all but the latest keep events."""
+        raise NotImplementedError
+
+
+# Functions run on a pooled connection by SQLiteOrderStorage, each bumps the orders version in its own transaction
+def write_orders(conn, versions, query, params):
+    changed = conn.execute(query, params).rowcount
+    return changed, versions.bump(conn, "orders") if changed else None
+
+
+def insert_order_batch(conn, versions, orders):
+    # Take the write lock up front so the duplicate check and the insert see the same data
+    conn.execute("BEGIN IMMEDIATE")
+    placeholders = ", ".join("?" * len(orders))
+    taken_codes = {row[0] for row in conn.execute(
+        f"SELECT order_code FROM orders WHERE order_code IN ({placeholders})",
+        [order[CODE] for order in orders])}
+    taken_ids = {row[0] for row in conn.execute(
+        f"SELECT customer_id FROM orders WHERE customer_id IN ({placeholders})",
+        [order[CUSTOMER_ID] for order in orders])}
+    statuses = []
+    rows = []
+    for order in orders:
+        if order[CODE] in taken_codes:
+            statuses.append("duplicate_order_code")
+        elif order[CUSTOMER_ID] in taken_ids:
+            statuses.append("duplicate_customer_id")
+        else:
+            statuses.append("created")
+            taken_codes.add(order[CODE])
+            taken_ids.add(order[CUSTOMER_ID])
+            rows.append(order)
+    conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    return statuses, versions.bump(conn, "orders") if rows else None
+
+
+def fetch_orders_by_code(conn, order_codes, chunk_size=500):
+    # One IN query per chunk, kept below SQLite's bound parameter limit
+    rows = []
+    for start in range(0, len(order_codes), chunk_size):
+        chunk = order_codes[start:start + chunk_size]
+        placeholders = ", ".join("?" * len(chunk))
+        rows.extend(conn.execute(f"SELECT * FROM orders WHERE order_code IN ({placeholders})", chunk).fetchall())
+    return rows
+
+
+class SQLiteOrderStorage(OrderStorage):
+    """Orders in the SQLite database, written through the pool or the group commit writer."""
+
+    def __init__(self, pool, versions, writer=None):
+        self.pool = pool
+        self.versions = versions
+        self.writer = writer
+
+    async def _write(self, query, params):
+        if self.writer is not None:
+            return await self.writer.submit(write_orders, self.versions, query, params)
+        return await self.pool.run_async(write_orders, self.versions, query, params)
+
+    async def create(self, row):
+        try:
+            _, version = await self._write("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)", tuple(row))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateOrderError(str(e))
+        return version
+
+    async def create_many(self, rows):
+        return await self.pool.run_async(insert_order_batch, self.versions, [tuple(row) for row in rows])
+
+    async def get(self, order_code):
+        return await self.pool.fetch_one("SELECT * FROM orders WHERE order_code=?", (order_code,))
+
+    async def get_many(self, order_codes):
+        return await self.pool.run_async(fetch_orders_by_code, order_codes)
+
+    async def update(self, order_code, fields):
+        try:
+            changed, version = await self._write(f"""
+                UPDATE orders
+                SET {', '.join(f"{column}=?" for column in fields)}
+                WHERE order_code=?
+            """, tuple(fields.values()) + (order_code,))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateOrderError(str(e))
+        return changed > 0, version
+
+    async def delete(self, order_code):
+        changed, version = await self._write("DELETE FROM orders WHERE order_code=?", (order_code,))
+        return changed > 0, version
+
+    async def search(self, text, limit, offset):
+        return await self.pool.fetch_all(f"""
+            SELECT {", ".join("o." + column for column in ORDER_COLUMNS)}
+            FROM orders_fts JOIN orders o ON o.rowid = orders_fts.rowid
+            WHERE orders_fts MATCH ?
+            ORDER BY orders_fts.rank
+            LIMIT ? OFFSET ?
+        """, (fts_match_expression(text), limit, offset))
+
+    async def stats(self):
+        return await self.pool.fetch_all(
+            "SELECT dimension, value, count FROM order_stats ORDER BY dimension, count DESC, value")
+
+    async def last_event(self):
+        row = await self.pool.fetch_one("SELECT max(seq) FROM order_events")
+        return row[0] or 0
+
+    async def events_after(self, seq, limit):
+        rows = await self.pool.fetch_all(
+            "SELECT seq, op, order_code, data FROM order_events WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit))
+        # The triggers store the order row as a JSON array
+        return [(seq, op, order_code, json.loads(data) if data is not None else None)
+                for seq, op, order_code, data in rows]
+
+    async def prune_events(self, keep):
+        await self.pool.execute(
+            "DELETE FROM order_events WHERE seq <= (SELECT max(seq) FROM order_events) - ?", (max(keep, 1),))
+
+
+def take_lock(lock_file):
+    """Lock lock_file for this process until the returned connection is closed, or the process ends.
+
+    The lock is an exclusive SQLite transaction, so it works on every platform and is released when a process dies.
+    """
+    conn = sqlite3.connect(lock_file, timeout=0, isolation_level=None, check_same_thread=False)
+    try:
+        conn.execute("BEGIN EXCLUSIVE")
+    except sqlite3.OperationalError:
+        conn.close()
+        raise RuntimeError(f"{lock_file} is locked by another process. The memory store keeps the orders of one "
+                           f"process, run the backend with a single worker.")
+    return conn
+
+
+class MemoryOrderStorage(OrderStorage):
+    """Orders in dictionaries, persisted with a snapshot file and an append-only log.
+
+    Every method runs on the event loop without awaiting in between, so the dictionaries need no lock. A log line is
+    flushed to the operating system before the write returns, which survives a crash of the process, and the snapshot
+    is synced to disk. With persistence turned off (no snapshot file) nothing is written at all.
+    """
+
+    def __init__(self, snapshot_file=None, log_file=None, snapshot_interval=60.0, lock_file=None):
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        self.snapshot_interval = snapshot_interval
+        self.lock_file = lock_file
+        self._lock = None
+        self._orders = {}
+        self._customer_ids = {}
+        self._counts = {dimension: Counter() for dimension in STATS_DIMENSIONS}
+        self._version = 0
+        # Recent (version, op, order_code, row) events, the version is their sequence number
+        self._events = deque()
+        self._log = None
+        self._logged_writes = 0
+        self._snapshot_task = None
+
+    # Persistence
+
+    async def start(self):
+        if self.lock_file is not None:
+            self._lock = take_lock(self.lock_file)
+        if self.snapshot_file is None:
+            return
+        await run_in_threadpool(self._load)
+        self._log = open(self.log_file, "a", encoding="utf-8")
+        self._snapshot_task = asyncio.get_running_loop().create_task(self._snapshot_periodically())
+        logging.info(f"Loaded {len(self._orders)} orders into memory at version {self._version}.")
+
+    async def close(self):
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+        if self._log is not None:
+            await self.snapshot()
+            self._log.close()
+            self._log = None
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def _load(self):
+        snapshot_version = 0
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            snapshot_version = snapshot["version"]
+            for row in snapshot["orders"]:
+                self._put(tuple(row))
+            self._version = snapshot_version
+        # The log rotated away by an interrupted snapshot comes first, entries already in the snapshot are skipped
+        for path in (self.log_file + ".old", self.log_file):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash, everything before it is intact
+                        logging.warning(f"Skipped a truncated line of {path}.")
+                        break
+                    if entry["version"] <= snapshot_version:
+                        continue
+                    if entry["op"] == "put":
+                        self._remove(entry["row"][CODE])
+                        self._put(tuple(entry["row"]))
+                    else:
+                        self._remove(entry["order_code"])
+                    self._version = max(self._version, entry["version"])
+
+    def _append(self, entry):
+        if self._log is not None:
+            self._log.write(json.dumps(entry) + "\n")
+            self._log.flush()
+            self._logged_writes += 1
+
+    async def snapshot(self):
+        """Write all orders to the snapshot file and start a new log."""
+        if self._log is None or self._logged_writes == 0:
+            return
+        # The copy and the log rotation happen together on the event loop, so no write falls between them
+        rows = list(self._orders.values())
+        version = self._version
+        self._log.close()
+        self._rotate_log()
+        self._log = open(self.log_file, "a", encoding="utf-8")
+        self._logged_writes = 0
+        await run_in_threadpool(self._write_snapshot, rows, version)
+
+    def _rotate_log(self):
+        old_log = self.log_file + ".old"
+        if not os.path.exists(old_log):
+            os.replace(self.log_file, old_log)
+            return
+        # The previous snapshot failed and its log is still needed, keep both logs in order
+        with open(self.log_file, encoding="utf-8") as source, open(old_log, "a", encoding="utf-8") as target:
+            target.write(source.read())
+        os.remove(self.log_file)
+
+    def _write_snapshot(self, rows, version):
+        temporary = self.snapshot_file + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "orders": rows}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.snapshot_file)
+        os.remove(self.log_file + ".old")
+        logging.info(f"Snapshot of {len(rows)} orders written at version {version}.")
+
+    async def _snapshot_periodically(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except OSError as e:
+                logging.error(f"Failed to write the order snapshot. Error: {e}")
+
+    # Indexes
+
+    def _put(self, row):
+        self._orders[row[CODE]] = row
+        self._customer_ids[row[CUSTOMER_ID]] = row[CODE]
+        for dimension in STATS_DIMENSIONS:
+            self._counts[dimension][row[ORDER_COLUMNS.index(dimension)]] += 1
+
+    def _remove(self, order_code):
+        row = self._orders.pop(order_code, None)
+        if row is None:
+            return None
+        del self._customer_ids[row[CUSTOMER_ID]]
+        for dimension in STATS_DIMENSIONS:
+            counts = self._counts[dimension]
+            value = row[ORDER_COLUMNS.index(dimension)]
+            counts[value] -= 1
+            if counts[value] <= 0:
+                del counts[value]
+        return row
+
+    def _taken(self, row):
+        if row[CODE] in self._orders:
+            return "duplicate_order_code"
+        if row[CUSTOMER_ID] in self._customer_ids:
+            return "duplicate_customer_id"
+        return None
+
+    def _next_version(self):
+        self._version += 1
+        return self._version
+
+    # OrderStorage
+
+    async def create(self, row):
+        row = tuple(row)
+        taken = self._taken(row)
+        if taken is not None:
+            raise DuplicateOrderError(taken)
+        self._put(row)
+        version = self._next_version()
+        self._append({"version": version, "op": "put", "row": row})
+        self._events.append((version, "created", row[CODE], row))
+        return version
+
+    async def create_many(self, rows):
+        statuses = []
+        version = None
+        for row in rows:
+            row = tuple(row)
+            taken = self._taken(row)
+            statuses.append(taken or "created")
+            if taken is None:
+                self._put(row)
+                version = self._next_version()
+                self._append({"version": version, "op": "put", "row": row})
+                self._events.append((version, "created", row[CODE], row))
+        return statuses, version
+
+    async def get(self, order_code):
+        return self._orders.get(order_code)
+
+    async def get_many(self, order_codes):
+        return [self._orders[order_code] for order_code in order_codes if order_code in self._orders]
+
+    async def update(self, order_code, fields):
+        row = self._orders.get(order_code)
+        if row is None:
+            return False, None
+        updated = list(row)
+        for column, value in fields.items():
+            updated[ORDER_COLUMNS.index(column)] = value
+        updated = tuple(updated)
+        owner = self._customer_ids.get(updated[CUSTOMER_ID])
+        if owner is not None and owner != order_code:
+            raise DuplicateOrderError("duplicate_customer_id")
+        self._remove(order_code)
+        self._put(updated)
+        version = self._next_version()
+        self._append({"version": version, "op": "put", "row": updated})
+        self._events.append((version, "updated", order_code, updated))
+        return True, version
+
+    async def delete(self, order_code):
+        if self._remove(order_code) is None:
+            return False, None
+        version = self._next_version()
+        self._append({"version": version, "op": "delete", "order_code": order_code})
+        self._events.append((version, "deleted", order_code, None))
+        return True, version
+
+    async def search(self, text, limit, offset):
+        words = text.lower().split()
+        positions = [ORDER_COLUMNS.index(column) for column in SEARCH_COLUMNS]
+        matches = []
+        for row in self._orders.values():
+            tokens = " ".join(row[position] for position in positions).lower().split()
+            if all(any(token.startswith(word) for token in tokens) for word in words):
+                matches.append(row)
+                if len(matches) >= offset + limit:
+                    break
+        return matches[offset:offset + limit]
+
+    async def stats(self):
+        return [(dimension, value, count)
+                for dimension in STATS_DIMENSIONS
+                for value, count in sorted(self._counts[dimension].items(), key=lambda item: (-item[1], item[0]))]
+
+    async def last_event(self):
+        return self._version
+
+    async def events_after(self, seq, limit):
+        events = []
+        # Walk back from the newest event, the ones asked for are usually the last few
+        for event in reversed(self._events):
+            if event[0] <= seq:
+                break
+            events.append(event)
+        events.reverse()
+        return events[:limit]
+
+    async def prune_events(self, keep):
+        while len(self._events) > max(keep, 1):
+            self._events.popleft()
@@ -0,0 +1,56 @@
+"""
+Happy Restaurant Bulk Import Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check the NDJSON bulk import with every storage engine: the body is written chunk by chunk as it arrives,
+and every non-empty line gets its result in input order with its line number, whether it was created, rejected as a
+duplicate or invalid, also when a line is split between two parts of the body.
+
+Usage:
+    python -m pytest -q test_bulk_import.py
+"""
+
+# Import necessary libraries
+import json
+import restaurant_backend
+from conftest import new_order
+
+
+def test_ndjson_results_keep_the_input_order(client, monkeypatch):
+    # Small chunks, so the invalid lines fall between chunks written at different times
+    monkeypatch.setattr(restaurant_backend, "BULK_CHUNK_SIZE", 2)
+    assert client.post("/orders/", json=new_order("N0")).status_code == 200
+    lines = [
+        json.dumps(new_order("N1")),
+        "{not json",
+        json.dumps(new_order("N0")),
+        "",
+        json.dumps(new_order("N2")),
+        json.dumps({"order_code": "N3"}),
+        json.dumps(new_order("N1")),
+        json.dumps(dict(new_order("N4"), customer_id="N2-customer")),
+        json.dumps(new_order("N5")),
+    ]
+    body = "\n".join(lines).encode()
+    # The body arrives in parts that cut lines in two, and its last line has no newline
+    parts = [body[start:start + 37] for start in range(0, len(body), 37)]
+    response = client.post("/orders/bulk/ndjson", content=iter(parts))
+    assert response.status_code == 200
+    summary = response.json()
+    assert (summary["created"], summary["rejected"]) == (3, 5)
+    assert [(result["line"], result.get("order_code"), result["status"]) for result in summary["results"]] == [
+        (1, "N1", "created"),
+        (2, None, "invalid"),
+        (3, "N0", "duplicate_order_code"),
+        (5, "N2", "created"),
+        (6, None, "invalid"),
+        (7, "N1", "duplicate_order_code"),
+        (8, "N4", "duplicate_customer_id"),
+        (9, "N5", "created"),
+    ]
+    for order_code in ("N1", "N2", "N5"):
+        assert client.get(f"/orders/{order_code}").status_code == 200
+    assert client.get("/orders/N4").status_code == 404
@@ -0,0 +1,88 @@
+"""
+Happy Restaurant Response Compression Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check that large JSON responses are compressed for the clients that accept it, that small ones are not,
+that streamed responses are compressed chunk by chunk, and that the precompressed landing page honours its ETag.
+
+Usage:
+    python -m pytest -q test_compression.py
+"""
+
+# Import necessary libraries
+import gzip
+import configparser
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from compression import Compressor, CompressionMiddleware, PrecompressedContent, accepted_encodings
+
+PAGE = PrecompressedContent("<html><body>" + "Happy Restaurant " * 50 + "</body></html>", "text/html; charset=utf-8")
+
+
+def new_client(config_text=""):
+    config = configparser.ConfigParser()
+    config.read_string(config_text)
+    compressor = Compressor()
+    compressor.configure(config)
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, compressor=compressor)
+
+    @app.get("/large")
+    def large():
+        return [{"order_code": f"A{i}", "food_name": "Pizza"} for i in range(100)]
+
+    @app.get("/small")
+    def small():
+        return {"order_code": "A1"}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"line {i}\n" for i in range(1000)), media_type="text/plain")
+
+    @app.get("/")
+    def page(request: Request):
+        return PAGE.response(request, compressor)
+
+    return TestClient(app)
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip;q=0.5, br , identity;q=0") == {"gzip": 0.5, "br": 1.0, "identity": 0.0}
+    assert Compressor().choose("br;q=0, gzip") == "gzip"
+    assert Compressor().choose("identity") is None
+
+
+def test_large_responses_are_compressed():
+    client = new_client()
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) < len(response.content)
+    assert len(response.json()) == 100
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert small.headers["Vary"] == "Accept-Encoding"
+    assert "Content-Encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+    assert "Content-Encoding" not in new_client("[compression]\nenabled = false\n").get(
+        "/large", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_streamed_responses_are_compressed():
+    client = new_client()
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["Content-Encoding"] == "gzip"
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw).decode().count("\n") == 1000
+
+
+def test_precompressed_page_and_etag():
+    client = new_client()
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.text.startswith("<html>")
+    assert client.get("/", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
@@ -0,0 +1,112 @@
+"""
+Happy Restaurant Order Events Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check the live order feed: the writes are pushed to a WebSocket subscriber in order, a subscriber resumes
+after the last sequence number it received, gets a reset when the events it missed are no longer kept, and is dropped
+when it falls behind by more than its queue, and that the bus stops when it is closed during a read of the store. The
+backend runs once with every storage engine.
+
+Usage:
+    python -m pytest -q test_events.py
+"""
+
+# Import necessary libraries
+import json
+import time
+import asyncio
+import pytest
+from starlette.concurrency import run_in_threadpool
+from events import EventBus
+from storage import MemoryOrderStorage
+from conftest import new_order
+from test_storage import new_row
+
+
+def test_writes_are_pushed_and_resumed(client):
+    with client.websocket_connect("/events/orders") as socket:
+        client.post("/orders/", json=new_order("E1"))
+        client.put("/orders/E1", json={"food_name": "Sushi"})
+        client.delete("/orders/E1")
+        created, updated, deleted = socket.receive_json(), socket.receive_json(), socket.receive_json()
+    assert [created["op"], updated["op"], deleted["op"]] == ["created", "updated", "deleted"]
+    assert created["order"][0] == "E1" and updated["order"][1] == "Sushi" and deleted["order"] is None
+    assert updated["seq"] == created["seq"] + 1 and deleted["seq"] == created["seq"] + 2
+
+    # A client that saw the first event gets the two it missed, then the live ones
+    with client.websocket_connect(f"/events/orders?after={created['seq']}") as socket:
+        assert socket.receive_json()["seq"] == updated["seq"]
+        assert socket.receive_json()["seq"] == deleted["seq"]
+        client.post("/orders/", json=new_order("E2"))
+        assert socket.receive_json()["order_code"] == "E2"
+
+    # Sequence numbers the server never handed out mean the client has to reload
+    with client.websocket_connect("/events/orders?after=1000000") as socket:
+        assert socket.receive_json()["op"] == "reset"
+
+
+def test_pruned_events_reset_and_slow_subscribers_are_dropped():
+    async def scenario():
+        storage = MemoryOrderStorage()
+        bus = EventBus(storage, queue_size=2, history=1, poll_interval=0.01)
+        await bus.start()
+        for order_code in ("P1", "P2", "P3"):
+            await storage.create(new_row(order_code))
+        await storage.prune_events(bus.history)
+        # Only event 3 is kept, a client that saw event 1 missed event 2 and cannot resume
+        replay = bus.subscribe(after=1)
+        seq, op, payload = await replay.__anext__()
+        assert op == "reset" and json.loads(payload)["last"] == 3
+        await replay.aclose()
+
+        slow = bus.subscribe()
+        first = asyncio.ensure_future(slow.__anext__())
+        await asyncio.sleep(0.05)
+        for order_code in ("P4", "P5", "P6", "P7"):
+            await storage.create(new_row(order_code))
+            bus.wake()
+            await asyncio.sleep(0.05)
+        # The subscriber took one event and never came back for the others, so its stream ends
+        assert (await first)[0] == 4
+        with pytest.raises(StopAsyncIteration):
+            while True:
+                await slow.__anext__()
+        assert bus.dropped == 1 and bus.subscribers == 0
+        await bus.close()
+
+    asyncio.run(scenario())
+
+
+class SlowStorage(MemoryOrderStorage):
+    """Memory store whose event reads block a worker thread, like the SQLite store under load."""
+
+    def __init__(self):
+        super().__init__()
+        self.reading = asyncio.Event()
+        self.reads = 0
+
+    async def last_event(self):
+        self.reads += 1
+        self.reading.set()
+        await run_in_threadpool(time.sleep, 0.2)
+        return await super().last_event()
+
+
+def test_close_during_a_storage_read():
+    async def scenario():
+        storage = SlowStorage()
+        bus = EventBus(storage, poll_interval=0.01)
+        await bus.start()
+        storage.reading.clear()
+        bus.wake()
+        await storage.reading.wait()
+        # The read cannot be cancelled, close waits for it and the loop then stops
+        await asyncio.wait_for(bus.close(), 1)
+        reads = storage.reads
+        await asyncio.sleep(0.1)
+        assert storage.reads == reads
+
+    asyncio.run(scenario())
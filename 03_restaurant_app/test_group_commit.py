@@ -0,0 +1,81 @@
+"""
+Happy Restaurant Group Commit Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check the group commit writer under concurrent writes: the writes of a burst share their transactions, a
+write that fails is rolled back alone and its exception reaches only its own caller, and through the backend, of the
+concurrent creations of the same order code exactly one succeeds and the others get a 400.
+
+Usage:
+    python -m pytest -q test_group_commit.py
+"""
+
+# Import necessary libraries
+import sqlite3
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+import restaurant_backend
+from database import ConnectionPool
+from group_commit import GroupCommitWriter
+from conftest import CONFIG, new_order
+
+
+def insert_code(conn, order_code):
+    conn.execute("INSERT INTO codes VALUES (?)", (order_code,))
+    return order_code
+
+
+def test_failed_writes_are_rolled_back_alone(tmp_path, monkeypatch):
+    pool = ConnectionPool(str(tmp_path / "writes.db"))
+    pool.run(lambda conn: conn.execute("CREATE TABLE codes (code TEXT PRIMARY KEY)"))
+    batches = []
+    write_batch = GroupCommitWriter._write_batch
+
+    def counted_write_batch(conn, writes):
+        batches.append(len(writes))
+        return write_batch(conn, writes)
+
+    monkeypatch.setattr(GroupCommitWriter, "_write_batch", staticmethod(counted_write_batch))
+    writer = GroupCommitWriter(pool, max_delay=0.05)
+
+    async def scenario():
+        writer.start()
+        # Three writers per code
+        outcomes = await asyncio.gather(*(writer.submit(insert_code, f"G{i % 10}") for i in range(30)),
+                                        return_exceptions=True)
+        await writer.close()
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+    assert sorted(outcome for outcome in outcomes if isinstance(outcome, str)) == [f"G{i}" for i in range(10)]
+    assert all(isinstance(outcome, sqlite3.IntegrityError) for outcome in outcomes if not isinstance(outcome, str))
+    assert sum(batches) == 30 and len(batches) < 30
+    assert pool.run(lambda conn: conn.execute("SELECT COUNT(*) FROM codes").fetchone()) == (10,)
+    pool.close()
+
+
+@pytest.fixture
+def group_commit_client(tmp_path, monkeypatch):
+    config = CONFIG.format(engine="sqlite").replace("[database]\n", "[database]\ngroup_commit = true\n")
+    (tmp_path / "config.ini").write_text(config)
+    monkeypatch.chdir(tmp_path)
+    with TestClient(restaurant_backend.app) as client:
+        yield client
+
+
+def test_concurrent_duplicates_get_one_success_per_code(group_commit_client):
+    assert restaurant_backend.storage.writer is not None
+    codes = [f"D{i % 8}" for i in range(40)]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        responses = list(executor.map(lambda code: group_commit_client.post("/orders/", json=new_order(code)), codes))
+    created = Counter(code for code, response in zip(codes, responses) if response.status_code == 200)
+    assert created == Counter({f"D{i}": 1 for i in range(8)})
+    assert sorted(response.status_code for response in responses) == [200] * 8 + [400] * 32
+    for i in range(8):
+        assert group_commit_client.get(f"/orders/D{i}").status_code == 200
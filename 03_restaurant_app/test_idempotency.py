@@ -0,0 +1,98 @@
+"""
+Happy Restaurant Idempotency Key Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check that a retried POST /orders/ with the same Idempotency-Key gets the stored response of the first
+request without writing again, also after a restart or on another worker, that a key reused with another body is
+rejected, that a key reserved by a request still running in another worker is answered with 409, and that a failed
+request releases its key.
+
+Usage:
+    python -m pytest -q test_idempotency.py
+"""
+
+# Import necessary libraries
+import time
+from fastapi.testclient import TestClient
+import restaurant_backend
+from conftest import new_order
+
+
+def test_retries_are_replayed(app_folder):
+    headers = {"Idempotency-Key": "retry-1"}
+    with TestClient(restaurant_backend.app) as client:
+        first = client.post("/orders/", json=new_order("I1"), headers=headers)
+        retry = client.post("/orders/", json=new_order("I1"), headers=headers)
+        assert first.status_code == retry.status_code == 200
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+
+        # Without the key the same order is a duplicate
+        assert client.post("/orders/", json=new_order("I1")).status_code == 400
+        other = dict(new_order("I1"), food_name="Sushi")
+        assert client.post("/orders/", json=other, headers=headers).status_code == 422
+        assert client.post("/orders/", json=new_order("I2"), headers={"Idempotency-Key": "x" * 300}).status_code == 400
+
+    # The stored response survives a restart of the backend
+    with TestClient(restaurant_backend.app) as client:
+        retry = client.post("/orders/", json=new_order("I1"), headers=headers)
+        assert retry.status_code == 200
+        assert retry.headers["Idempotent-Replayed"] == "true"
+
+
+def test_replay_does_not_write(app_folder, monkeypatch):
+    headers = {"Idempotency-Key": "retry-2"}
+    with TestClient(restaurant_backend.app) as client:
+        client.post("/orders/", json=new_order("I3"), headers=headers)
+        storage = restaurant_backend.storage
+
+        async def no_create(row):
+            raise AssertionError("a replay must not write")
+
+        monkeypatch.setattr(storage, "create", no_create)
+        assert client.post("/orders/", json=new_order("I3"), headers=headers).status_code == 200
+
+
+def test_keys_are_shared_by_the_workers(app_folder):
+    headers = {"Idempotency-Key": "retry-3"}
+    with TestClient(restaurant_backend.app) as client:
+        store = restaurant_backend.idempotency_store
+        first = client.post("/orders/", json=new_order("I4"), headers=headers)
+        key = next(iter(store._entries))
+        # Another worker knows the key from the database only, its retry replays the stored 200
+        store._entries.clear()
+        retry = client.post("/orders/", json=new_order("I4"), headers=headers)
+        assert retry.status_code == 200 and retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+
+        # A key reserved by a request still running in another worker is refused until it finished
+        fingerprint = store._entries[key].fingerprint
+        pending_key = key.replace("retry-3", "retry-4")
+        pending = (pending_key, fingerprint, time.time() + 60)
+        restaurant_backend.pool.run(
+            lambda conn: conn.execute("INSERT INTO idempotency_keys VALUES (?, ?, 0, NULL, X'', ?)", pending))
+        busy = client.post("/orders/", json=new_order("I4"), headers={"Idempotency-Key": "retry-4"})
+        assert busy.status_code == 409 and busy.headers["Retry-After"] == "1"
+        other = client.post("/orders/", json=new_order("I5"), headers={"Idempotency-Key": "retry-4"})
+        assert other.status_code == 422
+
+
+
+def test_failed_requests_release_their_key(app_folder, monkeypatch):
+    headers = {"Idempotency-Key": "retry-5"}
+    with TestClient(restaurant_backend.app, raise_server_exceptions=False) as client:
+        create = restaurant_backend.storage.create
+
+        async def failing_create(row):
+            raise RuntimeError("database is gone")
+
+        monkeypatch.setattr(restaurant_backend.storage, "create", failing_create)
+        assert client.post("/orders/", json=new_order("I6"), headers=headers).status_code == 500
+        keys = restaurant_backend.pool.run(lambda conn: conn.execute("SELECT key FROM idempotency_keys").fetchall())
+        assert keys == []
+        # The retry runs the request again
+        monkeypatch.setattr(restaurant_backend.storage, "create", create)
+        assert client.post("/orders/", json=new_order("I6"), headers=headers).status_code == 200
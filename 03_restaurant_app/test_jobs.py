@@ -0,0 +1,175 @@
+"""
+Happy Restaurant Background Jobs Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check that a job failing once is retried after its backoff, that a job failing every attempt is marked
+failed with its last error, that a job claimed by a worker that never finished it runs again after its visibility
+timeout, and that the workers stop when the queue is closed during a claim. The jobs of an order are committed or
+rolled back with it, and a created order gets its kitchen ticket without waiting for it, with every storage engine.
+
+Usage:
+    python -m pytest -q test_jobs.py
+"""
+
+# Import necessary libraries
+import json
+import time
+import sqlite3
+import asyncio
+import configparser
+import pytest
+from starlette.concurrency import run_in_threadpool
+from fastapi.testclient import TestClient
+import restaurant_backend
+from database import ConnectionPool
+from jobs import JobQueue
+from conftest import CONFIG, new_order
+
+JOBS_CONFIG = """
+[jobs]
+workers = 2
+poll_interval = 0.02
+visibility_timeout = 0.2
+max_attempts = 3
+backoff = 0.01
+"""
+
+
+def new_queue(tmp_path):
+    config = configparser.ConfigParser()
+    config.read_string(JOBS_CONFIG)
+    pool = ConnectionPool(str(tmp_path / "jobs.db"))
+    pool.run(JobQueue.create_table)
+    queue = JobQueue()
+    queue.configure(config, pool)
+    return queue, pool
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_failed_jobs_are_retried_then_given_up(tmp_path):
+    queue, pool = new_queue(tmp_path)
+    calls = {"flaky": 0, "broken": 0}
+
+    @queue.handler("flaky")
+    async def flaky(payload):
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            raise RuntimeError("printer offline")
+
+    @queue.handler("broken")
+    async def broken(payload):
+        calls["broken"] += 1
+        raise RuntimeError("always fails")
+
+    async def scenario():
+        await queue.start()
+        await queue.enqueue("flaky", {"order_code": "J1"})
+        await queue.enqueue("broken", {"order_code": "J2"})
+        await wait_for(lambda: queue.completed == 1 and calls["broken"] == 3)
+        await asyncio.sleep(0.1)
+        await queue.close()
+        return await queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert calls == {"flaky": 2, "broken": 3}
+    assert stats["queued"] == 0 and stats["failed"] == 1 and stats["retried"] == 3
+    assert pool.run(lambda conn: conn.execute("SELECT last_error FROM jobs").fetchone()) == \
+        ("RuntimeError: always fails",)
+    pool.close()
+
+
+def test_abandoned_jobs_run_again_after_their_visibility_timeout(tmp_path):
+    queue, pool = new_queue(tmp_path)
+    done = []
+
+    @queue.handler("ticket")
+    async def ticket(payload):
+        done.append(payload["order_code"])
+
+    async def scenario():
+        await queue.enqueue("ticket", {"order_code": "J3"})
+        # A worker of another process claims the job and dies
+        assert pool.run(queue._claim) is not None
+        assert pool.run(queue._claim) is None
+        await queue.start()
+        await wait_for(lambda: done)
+        await queue.close()
+
+    asyncio.run(scenario())
+    assert done == ["J3"]
+    pool.close()
+
+
+class SlowPool(ConnectionPool):
+    """Pool whose queries block a worker thread for a while, like a database under load."""
+
+    def __init__(self, database_file):
+        super().__init__(database_file)
+        self.claims = 0
+
+    async def run_async(self, func, *args):
+        self.claims += 1
+        await run_in_threadpool(time.sleep, 0.1)
+        return await super().run_async(func, *args)
+
+
+def test_close_while_claiming(tmp_path):
+    config = configparser.ConfigParser()
+    config.read_string(JOBS_CONFIG)
+    pool = SlowPool(str(tmp_path / "jobs.db"))
+    pool.run(JobQueue.create_table)
+    queue = JobQueue()
+    queue.configure(config, pool)
+
+    async def scenario():
+        await queue.start()
+        await asyncio.sleep(0.05)
+        # The claims in the thread pool cannot be cancelled, close waits for them and the workers then stop
+        await asyncio.wait_for(queue.close(), 1)
+        claims = pool.claims
+        await asyncio.sleep(0.2)
+        assert pool.claims == claims
+
+    asyncio.run(scenario())
+    pool.close()
+
+
+def test_jobs_are_committed_with_their_order():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    restaurant_backend.create_table(conn)
+    restaurant_backend.set_order_jobs(conn, ["kitchen_ticket"], 3)
+    row = tuple(new_order("J6").values())
+    conn.execute("BEGIN")
+    conn.execute("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+    conn.execute("ROLLBACK")
+    assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone() == (0,)
+    conn.execute("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+    kind, payload, max_attempts, run_at = conn.execute(
+        "SELECT kind, payload, max_attempts, run_at FROM jobs").fetchone()
+    assert (kind, json.loads(payload), max_attempts) == ("kitchen_ticket", new_order("J6"), 3)
+    assert abs(run_at - time.time()) < 5
+
+
+@pytest.mark.parametrize("engine", ["sqlite", "memory"])
+def test_created_orders_get_a_kitchen_ticket(engine, tmp_path, monkeypatch):
+    (tmp_path / "config.ini").write_text(CONFIG.format(engine=engine) + JOBS_CONFIG + "order_jobs = kitchen_ticket\n")
+    monkeypatch.chdir(tmp_path)
+    with TestClient(restaurant_backend.app) as client:
+        assert client.post("/orders/", json=new_order("J4")).status_code == 200
+        assert client.post("/orders/", json=new_order("J4")).status_code == 400
+        assert client.post("/orders/bulk/", json=[new_order("J5"), new_order("J4")]).json()["created"] == 1
+        deadline = time.monotonic() + 5
+        while client.get("/jobs/stats").json()["completed"] < 2:
+            assert time.monotonic() < deadline, "timed out"
+            time.sleep(0.02)
+    tickets = (tmp_path / "logs" / "kitchen_tickets.log").read_text().splitlines()
+    assert sorted(line.split("\t")[0] for line in tickets) == ["J4", "J5"]
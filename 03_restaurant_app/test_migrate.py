@@ -0,0 +1,59 @@
+"""
+Happy Restaurant Schema Migration Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check that an orders table created by the first versions of the backend is migrated to the latest schema
+version once, with an index on the customer ID even when customer IDs are duplicated, that the order lookups then use
+an index, and that a database of a newer backend is refused.
+
+Usage:
+    python -m pytest -q test_migrate.py
+"""
+
+# Import necessary libraries
+import sqlite3
+import pytest
+import restaurant_backend
+from migrate import migrate, full_scans, column_indexed, schema_version
+
+LEGACY_ORDERS = """
+    CREATE TABLE orders (
+        order_code VARCHAR NOT NULL, food_name VARCHAR, customer_name VARCHAR, customer_surname VARCHAR,
+        customer_id VARCHAR, delivery_address VARCHAR, payment_method VARCHAR, PRIMARY KEY (order_code)
+    )
+"""
+
+
+@pytest.fixture
+def legacy_db():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.execute(LEGACY_ORDERS)
+    conn.executemany("INSERT INTO orders VALUES (?, 'Pizza', 'Ada', 'Lovelace', ?, 'Rome', 'Cash')",
+                     [("A1", "C1"), ("A2", "C1"), ("A3", "C2")])
+    yield conn
+    conn.close()
+
+
+def test_legacy_database_is_migrated_once(legacy_db):
+    assert not column_indexed(legacy_db, "orders", "customer_id")
+    restaurant_backend.create_table(legacy_db)
+    assert schema_version(legacy_db) == len(restaurant_backend.MIGRATIONS)
+    # The duplicated customer ID only allows a plain index
+    assert column_indexed(legacy_db, "orders", "customer_id")
+    assert legacy_db.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 3
+    assert migrate(legacy_db, restaurant_backend.MIGRATIONS) == 0
+
+
+def test_lookups_use_an_index():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    restaurant_backend.create_table(conn)
+    assert full_scans(conn, restaurant_backend.CHECKED_QUERIES) == []
+
+
+def test_newer_database_is_refused(legacy_db):
+    legacy_db.execute(f"PRAGMA user_version = {len(restaurant_backend.MIGRATIONS) + 1}")
+    with pytest.raises(RuntimeError):
+        restaurant_backend.create_table(legacy_db)
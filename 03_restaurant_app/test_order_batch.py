@@ -0,0 +1,46 @@
+"""
+Happy Restaurant Batch Lookup Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check POST /orders/batch/ with every storage engine: the orders come back in the order of the requested
+codes, once per code, with the unknown codes listed as missing, whether they are read from the cache or the store, an
+order changed after it was cached is served as changed, and a request with too many codes is rejected.
+
+Usage:
+    python -m pytest -q test_order_batch.py
+"""
+
+# Import necessary libraries
+import restaurant_backend
+from conftest import new_order
+
+
+def test_batch_lookup(client):
+    for order_code in ("B1", "B2", "B3"):
+        assert client.post("/orders/", json=new_order(order_code)).status_code == 200
+    # B2 is cached by its read, the others come from the store
+    assert client.get("/orders/B2").status_code == 200
+    response = client.post("/orders/batch/", json={"order_codes": ["B3", "X1", "B2", "B1", "B3"]})
+    assert response.status_code == 200
+    batch = response.json()
+    assert [order[0] for order in batch["orders"]] == ["B3", "B2", "B1"]
+    assert batch["orders"][0] == list(new_order("B3").values())
+    assert batch["missing"] == ["X1"]
+
+    # The orders read by the batch are cached, a later write is still seen
+    assert client.put("/orders/B1", json={"food_name": "Sushi"}).status_code == 200
+    assert client.delete("/orders/B3").status_code == 200
+    batch = client.post("/orders/batch/", json={"order_codes": ["B1", "B3"]}).json()
+    assert [(order[0], order[1]) for order in batch["orders"]] == [("B1", "Sushi")]
+    assert batch["missing"] == ["B3"]
+
+
+def test_too_many_codes_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(restaurant_backend, "MAX_BATCH_CODES", 3)
+    # Repeated codes count once
+    assert client.post("/orders/batch/", json={"order_codes": ["B1", "B2", "B3", "B1"]}).status_code == 200
+    assert client.post("/orders/batch/", json={"order_codes": ["B1", "B2", "B3", "B4"]}).status_code == 400
+    assert client.post("/orders/batch/", json={"order_codes": []}).json() == {"orders": [], "missing": []}
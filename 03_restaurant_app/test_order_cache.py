@@ -0,0 +1,72 @@
+"""
+Happy Restaurant Order Cache Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check that the read-through order cache and the ETags of GET /orders/{order_code} never serve an order
+that was changed while it was being read. The backend runs once with every storage engine
+(see the client fixture of conftest.py).
+
+Usage:
+    python -m pytest -q test_order_cache.py
+"""
+
+# Import necessary libraries
+import restaurant_backend
+from conftest import new_order
+
+
+def test_update_during_read_is_not_cached(client, monkeypatch):
+    client.post("/orders/", json=new_order("R1"))
+    storage = restaurant_backend.storage
+    get = storage.get
+
+    async def get_then_update(order_code):
+        # The update commits and invalidates the order after the read took its row
+        row = await get(order_code)
+        await restaurant_backend.update_order("R1", restaurant_backend.OrderUpdate(food_name="Sushi"))
+        return row
+
+    monkeypatch.setattr(storage, "get", get_then_update)
+    first = client.get("/orders/R1")
+    monkeypatch.setattr(storage, "get", get)
+    assert first.json()[0][1] == "Pizza"
+
+    # The stale rows were not cached, so the next poll gets the update under a new ETag
+    second = client.get("/orders/R1", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json()[0][1] == "Sushi"
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+    third = client.get("/orders/R1", headers={"If-None-Match": second.headers["ETag"]})
+    assert third.status_code == 304
+
+
+def test_update_during_batch_read_is_not_cached(client, monkeypatch):
+    client.post("/orders/", json=new_order("R2"))
+    storage = restaurant_backend.storage
+    get_many = storage.get_many
+
+    async def get_many_then_update(order_codes):
+        rows = await get_many(order_codes)
+        await restaurant_backend.update_order("R2", restaurant_backend.OrderUpdate(food_name="Sushi"))
+        return rows
+
+    monkeypatch.setattr(storage, "get_many", get_many_then_update)
+    first = client.post("/orders/batch/", json={"order_codes": ["R2"]})
+    monkeypatch.setattr(storage, "get_many", get_many)
+    assert first.json()["orders"][0][1] == "Pizza"
+
+    second = client.post("/orders/batch/", json={"order_codes": ["R2"]})
+    assert second.json()["orders"][0][1] == "Sushi"
+
+
+def test_write_keeps_other_cached_orders(client):
+    client.post("/orders/", json=new_order("C1"))
+    client.post("/orders/", json=new_order("C2"))
+    client.get("/orders/C1")
+    client.put("/orders/C2", json={"food_name": "Sushi"})
+    client.get("/orders/C1")
+    assert client.get("/cache/stats").json()["hits"] == 1
@@ -0,0 +1,68 @@
+"""
+Happy Restaurant Rate Limiting Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check that the per-client token buckets answer over-limit requests with 429 and a Retry-After header,
+that only partner keys get a bucket of their own, that a rate of 0 is refused, and that writes are shed with 503
+while reads keep being served when too many writes are in flight.
+
+Usage:
+    python -m pytest -q test_rate_limit.py
+"""
+
+# Import necessary libraries
+import configparser
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from rate_limit import RateLimiter, RateLimitMiddleware
+
+
+def new_client(config_text):
+    config = configparser.ConfigParser()
+    config.read_string(config_text)
+    limiter = RateLimiter()
+    limiter.configure(config)
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    @app.post("/orders/")
+    def create():
+        return {"ok": True}
+
+    @app.get("/orders/{order_code}")
+    def read(order_code: str):
+        return {"order_code": order_code}
+
+    return TestClient(app), limiter
+
+
+def test_rate_limit_per_client():
+    client, _ = new_client("[rate_limits]\npost /orders/ = 1 3\n[clients]\npartner_keys = partner, other\n")
+    statuses = [client.post("/orders/").status_code for _ in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    response = client.post("/orders/")
+    assert response.headers["Retry-After"] == "1"
+    # A partner key has its own bucket, any other key is the client's IP address, and routes without a rule are not
+    # limited
+    assert client.post("/orders/", headers={"X-API-Key": "partner"}).status_code == 200
+    assert client.post("/orders/", headers={"X-API-Key": "made-up"}).status_code == 429
+    assert client.get("/orders/A1").status_code == 200
+
+
+def test_rates_must_be_positive():
+    with pytest.raises(ValueError):
+        new_client("[rate_limits]\npost /orders/ = 0 3\n")
+
+
+def test_writes_are_shed_when_overloaded():
+    client, limiter = new_client("[backpressure]\nmax_concurrent_writes = 1\nretry_after = 2\n")
+    assert client.post("/orders/").status_code == 200
+    limiter.writes_in_flight = 1
+    response = client.post("/orders/")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/orders/A1").status_code == 200
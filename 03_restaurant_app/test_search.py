@@ -0,0 +1,71 @@
+"""
+Happy Restaurant Order Search Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check the order search with every storage engine: every word of the query has to match the start of a word
+of the searched columns, the results are paged with limit and offset, and a query made of FTS5 syntax (quotes, stars,
+operators, parentheses, column filters) is searched as plain words instead of failing.
+
+Usage:
+    python -m pytest -q test_search.py
+"""
+
+# Import necessary libraries
+import sqlite3
+import pytest
+from database import fts_match_expression
+from conftest import new_order
+
+HOSTILE_QUERIES = ['"', 'pizza"', '"" OR', "*", "piz*", "NOT pizza", "a AND OR b", "NEAR(pizza sushi)", "(pizza",
+                   "food_name:pizza", "-pizza", "^pizza", "{food_name}: x", "pizza + sushi", "'; DROP TABLE orders"]
+
+
+def test_match_expression_quotes_every_word():
+    assert fts_match_expression("  piz  cust ") == '"piz"* "cust"*'
+    assert fts_match_expression('say "hi"') == '"say"* """hi"""*'
+    assert fts_match_expression("   ") == ""
+
+
+@pytest.mark.parametrize("query", HOSTILE_QUERIES)
+def test_hostile_queries_are_plain_words(query):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE VIRTUAL TABLE docs USING fts5(food_name, customer_name)")
+    conn.execute("INSERT INTO docs VALUES ('Pizza', 'NOT AND OR NEAR')")
+    # Every query is valid FTS5 syntax, whatever it matches
+    conn.execute("SELECT * FROM docs WHERE docs MATCH ?", (fts_match_expression(query),)).fetchall()
+    conn.close()
+
+
+def test_search(client):
+    orders = [dict(new_order("S1"), food_name="Pizza Margherita"),
+              dict(new_order("S2"), food_name="Sushi", customer_name="Pietro"),
+              dict(new_order("S3"), food_name="Pasta", delivery_address="2 Pizza Street"),
+              dict(new_order("S4"), food_name="Burger")]
+    for order in orders:
+        assert client.post("/orders/", json=order).status_code == 200
+    found = client.get("/search/orders", params={"q": "piz"}).json()
+    assert sorted(order["order_code"] for order in found) == ["S1", "S3"]
+    assert found[0].keys() == new_order("S1").keys()
+    # Every word has to match
+    found = client.get("/search/orders", params={"q": "PIZ marg"}).json()
+    assert [order["order_code"] for order in found] == ["S1"]
+    assert client.get("/search/orders", params={"q": "zza"}).json() == []
+    # Paging
+    first = client.get("/search/orders", params={"q": "test customer", "limit": 3}).json()
+    rest = client.get("/search/orders", params={"q": "test customer", "limit": 3, "offset": 3}).json()
+    assert len(first) == 3 and len(rest) == 1
+    assert {order["order_code"] for order in first + rest} == {"S1", "S2", "S3", "S4"}
+    assert client.get("/search/orders", params={"q": "  "}).status_code == 400
+    assert client.get("/search/orders", params={"q": "piz", "limit": 0}).status_code == 422
+
+
+@pytest.mark.parametrize("query", HOSTILE_QUERIES)
+def test_hostile_search_requests(client, query):
+    assert client.post("/orders/", json=new_order("S5")).status_code == 200
+    response = client.get("/search/orders", params={"q": query})
+    # Punctuation may be dropped by the tokenizer, so some of them find the order, none fails
+    assert response.status_code == 200
+    assert {order["order_code"] for order in response.json()} <= {"S5"}
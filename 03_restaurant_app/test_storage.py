@@ -0,0 +1,95 @@
+"""
+Happy Restaurant Order Storage Tests
+
+Author: Amir Sarrafzadeh Arasi
+Date: 2026-10-18
+
+Purpose:
+These tests check the in-memory order store: the duplicate checks, the search and statistics it answers from its
+indexes, that the orders survive a restart through the snapshot file and the append-only log, and that only one
+process at a time can open the store.
+
+Usage:
+    python -m pytest -q test_storage.py
+"""
+
+# Import necessary libraries
+import asyncio
+import pytest
+import serve
+from storage import MemoryOrderStorage, DuplicateOrderError
+
+
+def new_row(order_code, food_name="Pizza", payment_method="Cash"):
+    return (order_code, food_name, "Test", "Customer", f"{order_code}-customer", "1 Test Street", payment_method)
+
+
+def test_duplicates_search_and_stats():
+    async def scenario():
+        storage = MemoryOrderStorage()
+        await storage.create(new_row("A1"))
+        with pytest.raises(DuplicateOrderError):
+            await storage.create(new_row("A1"))
+        statuses, _ = await storage.create_many([new_row("A2", "Burger"), new_row("A2"), new_row("A3", "Pasta")])
+        assert statuses == ["created", "duplicate_order_code", "created"]
+        assert await storage.update("A3", {"food_name": "Pizza", "payment_method": "Credit Card"}) == (True, 4)
+        assert await storage.delete("A2") == (True, 5)
+        assert await storage.delete("A2") == (False, None)
+        assert [row[0] for row in await storage.search("piz cust", 10, 0)] == ["A1", "A3"]
+        assert await storage.stats() == [("food_name", "Pizza", 2),
+                                         ("payment_method", "Cash", 1), ("payment_method", "Credit Card", 1)]
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_and_log_survive_restart(tmp_path):
+    snapshot_file = str(tmp_path / "orders.snapshot.json")
+    log_file = str(tmp_path / "orders.log")
+
+    async def write():
+        storage = MemoryOrderStorage(snapshot_file, log_file, snapshot_interval=3600)
+        await storage.start()
+        await storage.create(new_row("B1"))
+        await storage.create(new_row("B2"))
+        await storage.snapshot()
+        # Written after the snapshot, so only the log has them
+        await storage.update("B1", {"food_name": "Sushi"})
+        await storage.delete("B2")
+        await storage.create(new_row("B3"))
+        # Simulate a crash: the log is left behind without a final snapshot
+        storage._snapshot_task.cancel()
+        storage._log.close()
+
+    async def read():
+        storage = MemoryOrderStorage(snapshot_file, log_file, snapshot_interval=3600)
+        await storage.start()
+        rows = {row[0]: row for row in await storage.get_many(["B1", "B2", "B3"])}
+        version = await storage.create(new_row("B4"))
+        await storage.close()
+        return rows, version
+
+    asyncio.run(write())
+    rows, version = asyncio.run(read())
+    assert sorted(rows) == ["B1", "B3"]
+    assert rows["B1"][1] == "Sushi"
+    assert version == 6
+
+
+def test_one_process_at_a_time(tmp_path, monkeypatch):
+    async def scenario():
+        lock_file = str(tmp_path / "orders.lock")
+        first = MemoryOrderStorage(lock_file=lock_file)
+        await first.start()
+        with pytest.raises(RuntimeError):
+            await MemoryOrderStorage(lock_file=lock_file).start()
+        await first.close()
+        second = MemoryOrderStorage(lock_file=lock_file)
+        await second.start()
+        await second.close()
+
+    asyncio.run(scenario())
+    # serve.py refuses to start several workers on the memory engine
+    (tmp_path / "config.ini").write_text("[storage]\nengine = memory\n")
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit):
+        serve.main(["--workers", "2"])